@@ -1,7 +1,6 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 from config import Config
 import uuid
-import io
 from datetime import datetime
 
 app = Flask(__name__)
@@ -66,6 +65,7 @@ from utils.email_utils import send_email, send_contact_form_email, create_succes
 from utils.qr_utils import generate_qr
 from utils.excel_utils import update_sheet, export_to_google_sheets, sync_sheet_after_delete, upsert_booking_row, delete_booking_from_sheet
 from utils.ticket_utils import generate_ticket_pdf
+from utils.jobs import job_queue
 
 # Razorpay client
 # razorpay_client = razorpay.Client(auth=(app.config['RAZORPAY_KEY_ID'], app.config['RAZORPAY_KEY_SECRET']))
@@ -74,20 +74,26 @@ from utils.ticket_utils import generate_ticket_pdf
 # ADMIN_USERNAME = app.config['ADMIN_USERNAME']
 # ADMIN_PASSWORD = app.config['ADMIN_PASSWORD']
 
+def _public_page(template):
+    """Public pages depend only on the event content: serve them from the rendered-page cache."""
+    content = EventContent.get_content()
+    if not app.config.get('PAGE_CACHE_ENABLED', True) or app.debug:
+        return render_template(template, content=content)
+    from utils.page_cache import page_cache
+    page = page_cache.get(template, content, lambda: render_template(template, content=content))
+    return page.response(request)
+
 @app.route('/')
 def home():
-    content = EventContent.get_content()
-    return render_template('index.html', content=content)
+    return _public_page('index.html')
 
 @app.route('/about')
 def about():
-    content = EventContent.get_content()
-    return render_template('about.html', content=content)
+    return _public_page('about.html')
 
 @app.route('/contact')
 def contact():
-    content = EventContent.get_content()
-    return render_template('contact.html', content=content)
+    return _public_page('contact.html')
 
 @app.route('/contact_submit', methods=['POST'])
 def contact_submit():
@@ -99,11 +105,9 @@ def contact_submit():
         message = request.form.get('message', '').strip()
         if not name or not email or not message:
             return jsonify({'success': False, 'message': 'Please fill in all required fields.'})
-        # Send message to spectraholi2026@gmail.com (or CONTACT_EMAIL)
-        sent = send_contact_form_email(name, email, phone, subject, message)
-        if sent:
-            return jsonify({'success': True, 'message': 'Thank you for your message! We will get back to you within 2 hours.'})
-        return jsonify({'success': False, 'message': 'Could not send email. Please try again or call us.'})
+        # Sent to spectraholi2026@gmail.com (or CONTACT_EMAIL) by a background job
+        job_queue.submit('contact_email', {'name': name, 'email': email, 'phone': phone, 'subject': subject, 'message': message})
+        return jsonify({'success': True, 'message': 'Thank you for your message! We will get back to you within 2 hours.'})
     except Exception as e:
         print(f"Contact submit error: {e}")
         return jsonify({'success': False, 'message': 'Could not send. Please try again.'})
@@ -116,28 +120,80 @@ def booking():
 def admin():
     if 'admin_logged_in' not in session:
         return redirect(url_for('admin_login'))
-    bookings = Booking.find_all()
-    
-    # Calculate revenue with better fallback
     content = EventContent.get_content()
-    pricing = content.get('pricing', {})
-    
-    total_revenue = 0
-    for b in bookings:
-        if b.get('payment_status') == 'Paid':
-            amount = b.get('amount')
-            if amount is not None:
-                total_revenue += amount
-            else:
-                # Fallback
-                p_type = b.get('pass_type', 'entry')
-                price = 200
-                if p_type == 'entry': price = pricing.get('entry_pass', 200)
-                elif p_type == 'entry_starter': price = pricing.get('entry_plus_starter', 350)
-                elif p_type == 'entry_starter_lunch': price = pricing.get('entry_plus_starter_lunch', 500)
-                total_revenue += b.get('passes', 1) * price
-
-    return render_template('admin.html', bookings=bookings, total_revenue=total_revenue, content=content)
+    # Header figures come from the index aggregates; table rows are paged in from /admin/api/bookings
+    stats = Booking.stats(content.get('pricing', {}))
+    return render_template('admin.html', stats=stats, content=content)
+
+# Projection for the admin table (and the default when ?fields= is not given)
+ADMIN_TABLE_FIELDS = ('name', 'email', 'phone', 'passes', 'amount', 'ticket_id', 'payment_status',
+                      'entry_status', 'pass_type', 'booking_date')
+ADMIN_API_FIELDS = ADMIN_TABLE_FIELDS + ('address', 'order_id', 'transaction_id', 'discount_description',
+                                         'is_couple_booking', 'is_group_booking')
+ADMIN_PAGE_SIZE_MAX = 500
+
+@app.route('/admin/api/bookings')
+def admin_api_bookings():
+    """
+    One page of bookings (admin only).
+    ?offset=0&limit=50&status=Paid,Pending&entry_status=Used&q=search&sort=-booking_date
+    &fields=name,ticket_id&refresh=1 (reload from the stores first)
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    args = request.args
+    try:
+        offset = max(0, int(args.get('offset') or 0))
+        limit = min(ADMIN_PAGE_SIZE_MAX, max(1, int(args.get('limit') or 50)))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'offset and limit must be integers'}), 400
+    split = lambda name: [v.strip() for v in args.get(name, '').split(',') if v.strip()]
+    fields = [f for f in split('fields') if f in ADMIN_API_FIELDS] or list(ADMIN_TABLE_FIELDS)
+    total, items = Booking.query(
+        filters={'payment_status': split('status'), 'entry_status': split('entry_status')},
+        search=args.get('q', '').strip(),
+        sort=args.get('sort', ''),
+        offset=offset,
+        limit=limit,
+        fields=fields,
+        refresh=args.get('refresh') == '1',
+    )
+    next_offset = offset + len(items)
+    return jsonify({
+        'success': True,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': next_offset if next_offset < total else None,
+        'items': items,
+    })
+
+@app.route('/admin/queue_status')
+def admin_queue_status():
+    """Write-behind queue depth and flush latency (admin only)."""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'})
+    from utils.write_queue import write_queue
+    return jsonify(write_queue.stats())
+
+@app.route('/admin/stats')
+def admin_stats():
+    """Dashboard aggregates (counts by status, revenue by pass type, passes) (admin only)."""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'})
+    content = EventContent.get_content()
+    return jsonify(Booking.stats(content.get('pricing', {})))
+
+@app.route('/admin/health')
+def admin_health():
+    """Circuit breaker state per backend (mongo, sheets, email) and the write-behind backlog (admin only)."""
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'})
+    from utils.health import backend_health
+    from utils.write_queue import write_queue
+    from models import mongo_query_plans
+    return jsonify({**backend_health.snapshot(), 'write_queue': write_queue.stats(),
+                    'mongo_query_plans': mongo_query_plans})
 
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
@@ -217,7 +273,7 @@ def create_order():
         pricing=pricing,
         discount_description=discount_description
     )
-    # Save to Google Sheet (primary), MongoDB (optional), and JSON (cache)
+    # Recorded locally now; Google Sheet (primary) and MongoDB (optional) are written by the write-behind queue
     booking.save()
 
     print(f"Booking saved with ticket_id: {ticket_id}")
@@ -282,41 +338,14 @@ def update_booking_status():
         modified = getattr(result, 'modified_count', 0)
         
         # Google Sheet is primary, so update always succeeds if booking exists
-        # If status changed to Paid and wasn't before, send ticket email
+        # If status changed to Paid and wasn't before, queue the ticket email (PDF + send run in the background)
         if new_status == 'Paid' and old_status != 'Paid':
-            content = EventContent.get_content()
-            venue = content.get('venue', 'Kunjachaya, Bhadreswar')
-            event_date = content.get('event_date', 'March 3, 2026')
-            booking_with_venue = {**booking, 'venue': venue, 'event_date': event_date, 'payment_status': new_status, 'pricing': content.get('pricing', {})}
-            
-            email_sent = False
-            try:
-                # Generate PDF ticket
-                pdf_buf = generate_ticket_pdf(booking_with_venue)
-                
-                # Create comprehensive email template with all booking and plan details
-                email_body = create_success_email_template(booking_with_venue, content)
-                
-                # Send email with ticket attachment
-                email_sent = send_email(
-                    booking['email'], 
-                    "🎉 Spectra HoliParty 2026 - Your Entry Pass Confirmed! 🎉", 
-                    email_body, 
-                    pdf_buf
-                )
-                if email_sent:
-                    print(f"Ticket email sent successfully to {booking['email']} for {booking['ticket_id']}")
-                else:
-                    print(f"Failed to send ticket email to {booking['email']} for {booking['ticket_id']}")
-            except Exception as e:
-                print(f"Error sending ticket email: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            # Return success (status updated in Google Sheet)
+            job = job_queue.submit('ticket_email', {'ticket_id': booking['ticket_id'], 'payment_status': new_status}, key=booking['ticket_id'])
             return jsonify({
-                'success': True, 
-                'message': 'Status updated successfully' + (' and email sent' if email_sent else ' (email failed - check logs)')
+                'success': True,
+                'message': 'Status updated successfully; ticket email queued',
+                'job_id': job['id'],
+                'mail_status': job['status'],
             })
         
         # Status updated successfully (Google Sheet is primary)
@@ -328,6 +357,58 @@ def update_booking_status():
         traceback.print_exc()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+@app.route('/bulk_update_booking_status', methods=['POST'])
+def bulk_update_booking_status():
+    """
+    Set one payment status on many bookings: {"ticket_ids": [...], "status": "Paid"}.
+    Store writes are batched; newly Paid tickets get their PDF + email jobs fanned out
+    across the job pool. Returns a result per ticket.
+    """
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+
+    try:
+        data = request.get_json() or {}
+        new_status = data.get('status')
+        ticket_ids = []
+        for t in data.get('ticket_ids') or []:
+            t = str(t).strip()
+            if t and t not in ticket_ids:
+                ticket_ids.append(t)
+        if not ticket_ids or not new_status:
+            return jsonify({'success': False, 'message': 'Missing ticket_ids or status'})
+
+        old_statuses = {}
+        for ticket_id in ticket_ids:
+            booking = Booking.find_one(ticket_id=ticket_id)
+            if booking:
+                old_statuses[ticket_id] = booking.get('payment_status', 'Pending')
+
+        updated = Booking.update_many(list(old_statuses), {'payment_status': new_status})
+
+        results = {}
+        for ticket_id in ticket_ids:
+            if ticket_id not in updated:
+                results[ticket_id] = {'success': False, 'message': 'Booking not found'}
+                continue
+            result = {'success': True, 'message': 'Status updated'}
+            if new_status == 'Paid' and old_statuses.get(ticket_id) != 'Paid':
+                job = job_queue.submit('ticket_email', {'ticket_id': ticket_id, 'payment_status': new_status}, key=ticket_id)
+                result.update(message='Status updated; ticket email queued', job_id=job['id'], mail_status=job['status'])
+            results[ticket_id] = result
+
+        updated_count = sum(1 for r in results.values() if r['success'])
+        return jsonify({
+            'success': updated_count > 0,
+            'message': f'{updated_count} of {len(ticket_ids)} booking(s) updated',
+            'results': results,
+        })
+    except Exception as e:
+        print(f"bulk_update_booking_status error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
 @app.route('/admin/content', methods=['GET', 'POST'])
 def admin_content():
     if 'admin_logged_in' not in session:
@@ -448,121 +529,317 @@ def admin_send_mail():
                     'message': 'Email not configured. Set RESEND_API_KEY and RESEND_FROM_EMAIL, or set EMAIL_PROVIDER=smtp to use Gmail.'
                 })
         
-        content = EventContent.get_content()
-        venue = content.get('venue', 'Kunjachaya, Bhadreswar')
-        event_date = content.get('event_date', 'March 3, 2026')
-        booking_with_venue = {**booking, 'venue': venue, 'event_date': event_date, 'pricing': content.get('pricing', {})}
-        
-        if mail_type == 'success':
-            try:
-                # Generate PDF ticket
-                pdf_buf = generate_ticket_pdf(booking_with_venue)
-                
-                # Create comprehensive email template with all booking and plan details
-                email_body = create_success_email_template(booking_with_venue, content)
-                
-                # Send email with ticket attachment via Resend
-                sent = send_email(
-                    booking['email'], 
-                    "🎉 Spectra HoliParty 2026 - Your Entry Pass Confirmed! 🎉", 
-                    email_body, 
-                    pdf_buf
-                )
-                if sent:
-                    provider = getattr(Config, 'EMAIL_PROVIDER', None) or 'resend'
-                    return jsonify({'success': True, 'message': f'Email sent successfully via {provider.upper()}!'})
-                else:
-                    provider = getattr(Config, 'EMAIL_PROVIDER', None) or 'resend'
-                    if provider == 'resend':
-                        return jsonify({
-                            'success': False, 
-                            'message': (
-                                'Email not sent. With onboarding@resend.dev you can only send to your Resend account email. '
-                                'To send to customers, verify a domain at resend.com/domains OR set EMAIL_PROVIDER=smtp to use Gmail.'
-                            )
-                        })
-                    else:
-                        return jsonify({
-                            'success': False, 
-                            'message': f'Email send failed. Check Render logs for details. Provider: {provider.upper()}'
-                        })
-            except Exception as e:
-                print(f"Error generating PDF or sending email: {e}")
-                import traceback
-                traceback.print_exc()
-                return jsonify({'success': False, 'message': f'Error: {str(e)}'})
-        else:
-            body = f"""
-            <h2>Dear {booking['name']},</h2>
-            <p>Greetings from <strong>Spectra Team</strong>!</p>
-            <p>We noticed your booking for <strong>Spectra HoliParty 2026</strong> (Ticket ID: {booking['ticket_id']}) could not be confirmed due to payment verification issues.</p>
-            {f"<p>Transaction ID submitted: {booking.get('transaction_id', 'Not provided')}</p>" if booking.get('transaction_id') else ""}
-            <p>If you have already made the payment, please contact us with your Ticket ID for manual verification.</p>
-            <p>For any queries, reach us at the numbers on our website.</p>
-            <p>— Spectra HoliParty Team</p>
-            """
-            sent = send_email(booking['email'], "Spectra HoliParty 2026 - Payment Verification Required", body)
-            if sent:
-                return jsonify({'success': True, 'message': 'Email sent successfully!'})
-            else:
-                return jsonify({
-                    'success': False, 
-                    'message': 'Email send failed. Check Render logs for details.'
-                })
+        # PDF generation and the provider call run in a background job; poll /admin/mail_status
+        kind = 'ticket_email' if mail_type == 'success' else 'failure_email'
+        job = job_queue.submit(kind, {'ticket_id': booking['ticket_id']}, key=booking['ticket_id'])
+        return jsonify({
+            'success': True,
+            'queued': True,
+            'message': 'Email queued',
+            'job_id': job['id'],
+            'mail_status': job['status'],
+        })
     except Exception as e:
         print(f"Admin send mail error: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+@app.route('/admin/mail_status')
+def admin_mail_status():
+    """Email job status (queued / sending / sent / failed) per ticket: ?ticket_id=A,B&mail_type=success"""
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    kind = 'failure_email' if request.args.get('mail_type') == 'failure' else 'ticket_email'
+    ticket_ids = [t.strip() for t in request.args.get('ticket_id', '').split(',') if t.strip()]
+    statuses = {}
+    for ticket_id in ticket_ids:
+        job = job_queue.latest(kind, ticket_id)
+        statuses[ticket_id] = {
+            'status': job['status'] if job else 'none',
+            'message': job.get('message', '') if job else '',
+            'job_id': job['id'] if job else None,
+            'updated_at': job.get('updated_at') if job else None,
+        }
+    return jsonify({'success': True, 'statuses': statuses})
+
 @app.route('/export_bookings')
 def export_bookings():
-    import pandas as pd
-    bookings = Booking.find_all()
-
-    data = []
-    for booking in bookings:
-        bdate = booking.get('booking_date', '')
-        if not bdate and booking.get('_id') and hasattr(booking['_id'], 'generation_time'):
-            try:
-                bdate = booking['_id'].generation_time.replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S')
-            except Exception:
-                bdate = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        if not bdate:
-            bdate = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        data.append({
-            'Name': booking.get('name', ''),
-            'Email': booking.get('email', ''),
-            'Phone': booking.get('phone', ''),
-            'Ticket ID': booking.get('ticket_id', ''),
-            'Passes': booking.get('passes', 0),
-            'Amount': booking.get('amount', booking.get('passes', 0) * 200),
-            'Payment Status': booking.get('payment_status', 'Pending'),
-            'Entry Status': booking.get('entry_status', 'Not Used'),
-            'Booking Date': bdate,
-            'Pass Type': booking.get('pass_type', 'entry'),
-            'Transaction ID': booking.get('transaction_id', ''),
-            'Discount Info': booking.get('discount_description', ''),
-        })
-
-    rows = [[r['Name'], r['Email'], r['Phone'], r['Ticket ID'], r['Passes'], r['Amount'], r['Payment Status'], r['Entry Status'], str(r['Booking Date']), r['Pass Type'], r['Transaction ID'], r['Discount Info']] for r in data]
-    export_to_google_sheets(rows)
-
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Bookings', index=False)
-
-    output.seek(0)
+    """Download every booking: ?format=xlsx (default) or ?format=csv, streamed row by row."""
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('admin_login'))
+    from flask import Response, send_file, stream_with_context
+    from utils.export_utils import iter_csv, write_xlsx
+
+    # The sheet rewrite the export used to do inline now runs as a background job
+    job_queue.submit('sheet_sync', {}, key='all')
+
+    export_format = (request.args.get('format') or 'xlsx').strip().lower()
+    if export_format == 'csv':
+        return Response(
+            stream_with_context(iter_csv(Booking.iter_all())),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=holi_party_bookings.csv'},
+        )
+    if export_format != 'xlsx':
+        return jsonify({'success': False, 'message': "format must be 'csv' or 'xlsx'"}), 400
 
-    # Return file for download
-    from flask import send_file
     return send_file(
-        output,
+        write_xlsx(Booking.iter_all()),
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         as_attachment=True,
         download_name='holi_party_bookings.xlsx'
     )
 
+# result -> HTTP status for /checkin (the JSON body carries the details either way)
+CHECKIN_STATUS_CODES = {'admitted': 200, 'already_used': 409, 'not_paid': 402, 'not_found': 404}
+
+def _gate_authorized():
+    """Admin session, or an X-Gate-Token header equal to GATE_TOKEN (gate devices)."""
+    import hmac
+    gate_token = getattr(Config, 'GATE_TOKEN', '') or ''
+    supplied = request.headers.get('X-Gate-Token', '')
+    return 'admin_logged_in' in session or bool(gate_token and hmac.compare_digest(supplied, gate_token))
+
+def _resolve_scan(scanned):
+    """Ticket ID for a scan (signed QR payload or a bare ticket ID); None if the signature is bad."""
+    from utils.gate_utils import is_signed_payload, verify_ticket
+    if is_signed_payload(scanned):
+        ticket = verify_ticket(scanned)
+        return ticket['ticket_id'] if ticket else None
+    return scanned
+
+def _checkin_body(result, ticket_id, booking):
+    body = {'success': result == 'admitted', 'result': result, 'ticket_id': ticket_id}
+    if booking:
+        body.update({
+            'name': booking.get('name', ''),
+            'passes': booking.get('passes', 1),
+            'pass_type': booking.get('pass_type', 'entry'),
+            'payment_status': booking.get('payment_status', 'Pending'),
+            'checked_in_at': booking.get('checked_in_at'),
+            'checked_in_gate': booking.get('checked_in_gate'),
+        })
+    return body
+
+@app.route('/checkin', methods=['POST'])
+def checkin():
+    """
+    Gate check-in for a scan: {"ticket_id": "<QR payload or ticket ID>", "gate": "Gate 1"}.
+    Authorised by the admin session or an X-Gate-Token header equal to GATE_TOKEN.
+    """
+    if not _gate_authorized():
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    data = request.get_json(silent=True)
+    if data is None:
+        data = request.form
+    scanned = data.get('ticket_id') if hasattr(data, 'get') else None
+    if not isinstance(scanned, str):
+        return jsonify({'success': False, 'result': 'invalid_scan',
+                        'message': 'Expected {"ticket_id": "<QR payload or ticket ID>"}'}), 400
+    scanned = scanned.strip()
+    if not scanned:
+        return jsonify({'success': False, 'result': 'not_found', 'message': 'ticket_id is required'}), 400
+    ticket_id = _resolve_scan(scanned)
+    if ticket_id is None:
+        return jsonify({'success': False, 'result': 'invalid_signature', 'ticket_id': ''}), 403
+    result, booking = Booking.check_in(ticket_id, gate=str(data.get('gate') or '').strip())
+    return jsonify(_checkin_body(result, ticket_id, booking)), CHECKIN_STATUS_CODES[result]
+
+@app.route('/gate/manifest')
+def gate_manifest_download():
+    """
+    Binary manifest of paid tickets for offline gates (layout in utils/gate_utils.py).
+    ?since=<X-Manifest-Version from a previous download> returns only the changes when possible.
+    """
+    if not _gate_authorized():
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    from flask import Response
+    from utils.gate_utils import gate_manifest
+    gate_manifest.refresh(Booking.data_version(), Booking.iter_all())
+    since = request.args.get('since')
+    body = gate_manifest.delta(since) if since else None
+    kind = 'delta' if body is not None else 'full'
+    if body is None:
+        body = gate_manifest.full()
+    return Response(body, mimetype='application/octet-stream', headers={
+        'X-Manifest-Version': gate_manifest.token(),
+        'X-Manifest-Kind': kind,
+        'Cache-Control': 'no-store',
+    })
+
+@app.route('/gate/config')
+def gate_config():
+    """QR verification key for gate devices (derived from SECRET_KEY, not SECRET_KEY itself)."""
+    if not _gate_authorized():
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    import base64
+    from utils.gate_utils import QR_PREFIX, SIGNATURE_BYTES, key_id, qr_key
+    return jsonify({
+        'success': True,
+        'qr_prefix': QR_PREFIX,
+        'signature_bytes': SIGNATURE_BYTES,
+        'key_id': key_id().hex(),
+        'qr_key': base64.b64encode(qr_key()).decode('ascii'),
+    })
+
+@app.route('/gate/sync', methods=['POST'])
+def gate_sync():
+    """
+    Bulk upload of check-ins a gate recorded offline:
+    {"gate": "Gate 2", "checkins": [{"ticket_id": "<QR payload or ID>", "scanned_at": "2026-03-03 10:12:00"}]}
+    Each scan goes through the same compare-and-set as /checkin: the first scan to reach the
+    server wins, later ones come back already_used with the winning gate and time.
+    """
+    if not _gate_authorized():
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    data = request.get_json(silent=True) or {}
+    checkins = data.get('checkins') if isinstance(data, dict) else None
+    if not isinstance(checkins, list):
+        return jsonify({'success': False, 'message': 'Expected {"gate": ..., "checkins": [...]}'}), 400
+    gate = str(data.get('gate') or '').strip()
+    results = []
+    for scan in checkins:
+        # One malformed item must not fail the whole upload from a gate device
+        if not isinstance(scan, dict):
+            results.append({'success': False, 'result': 'invalid_scan', 'ticket_id': ''})
+            continue
+        scanned = str(scan.get('ticket_id') or '').strip()
+        ticket_id = _resolve_scan(scanned) if scanned else None
+        if ticket_id is None:
+            results.append({'success': False, 'result': 'invalid_signature' if scanned else 'not_found',
+                            'ticket_id': ''})
+            continue
+        result, booking = Booking.check_in(ticket_id, gate=gate, at=(str(scan.get('scanned_at') or '') or None))
+        results.append(_checkin_body(result, ticket_id, booking))
+    counts = {}
+    for r in results:
+        counts[r['result']] = counts.get(r['result'], 0) + 1
+    return jsonify({'success': True, 'counts': counts, 'results': results})
+
+@app.route('/admin/exports', methods=['POST'])
+def admin_start_export():
+    """Start a background export: {"format": "xlsx" | "csv"}. Returns the job ID to poll."""
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    from utils.export_utils import EXPORT_FORMATS
+    data = request.get_json(silent=True)
+    if data is None:
+        data = request.form
+    export_format = (data.get('format') or 'xlsx') if hasattr(data, 'get') else None
+    if isinstance(export_format, str):
+        export_format = export_format.strip().lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': "format must be 'csv' or 'xlsx'"}), 400
+    job_queue.submit('sheet_sync', {}, key='all')
+    # Same format and data version: concurrent clicks share one job
+    job = job_queue.submit('bookings_export', {'format': export_format},
+                           key=f"{export_format}:{Booking.data_version()}")
+    return jsonify({'success': True, **_export_status(job)})
+
+@app.route('/admin/exports/<job_id>')
+def admin_export_status(job_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    job = job_queue.get(job_id)
+    if not job or job['kind'] != 'bookings_export':
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
+    return jsonify({'success': True, **_export_status(job)})
+
+@app.route('/admin/exports/<job_id>/download')
+def admin_export_download(job_id):
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('admin_login'))
+    import os
+    from flask import send_file
+    from utils.export_utils import export_dir
+    job = job_queue.get(job_id)
+    if not job or job['kind'] != 'bookings_export' or job['status'] != 'ready':
+        return jsonify({'success': False, 'message': 'Export not ready'}), 404
+    result = job.get('result') or {}
+    path = os.path.join(export_dir(), os.path.basename(result.get('file', '')))
+    if not os.path.isfile(path):
+        return jsonify({'success': False, 'message': 'Export file expired; start a new export'}), 410
+    mimetypes = {'csv': 'text/csv', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
+    return send_file(path, mimetype=mimetypes.get(result.get('format'), 'application/octet-stream'),
+                     as_attachment=True, download_name=f"holi_party_bookings.{result.get('format', 'xlsx')}")
+
+@app.route('/admin/tickets/bundle', methods=['POST'])
+def admin_start_ticket_bundle():
+    """Pre-render every paid ticket (background job; resumes if a previous run was interrupted)."""
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    job = job_queue.submit('ticket_bundle', {}, key='all')
+    return jsonify({'success': True, **_bundle_status(job)})
+
+@app.route('/admin/tickets/bundle/<job_id>')
+def admin_ticket_bundle_status(job_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    job = job_queue.get(job_id)
+    if not job or job['kind'] != 'ticket_bundle':
+        return jsonify({'success': False, 'message': 'Bundle job not found'}), 404
+    return jsonify({'success': True, **_bundle_status(job)})
+
+@app.route('/admin/tickets/bundle.zip')
+def admin_ticket_bundle_download():
+    """ZIP of the last built bundle, streamed from the rendered ticket files."""
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('admin_login'))
+    from flask import Response, stream_with_context
+    from utils.bulk_tickets import bundle_ready, iter_bundle_zip
+    if not bundle_ready():
+        return jsonify({'success': False, 'message': 'No ticket bundle built yet'}), 404
+    return Response(stream_with_context(iter_bundle_zip()), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=holi_party_tickets.zip'})
+
+@app.route('/admin/tickets/print.pdf')
+def admin_print_tickets():
+    """
+    One printable PDF of paid tickets, streamed as it renders (walk-in verification).
+    ?layout=page|grid (grid = 4 per A4 sheet), &ticket_id=A,B (default: every paid ticket),
+    &entry_status=Not Used
+    """
+    if 'admin_logged_in' not in session:
+        return redirect(url_for('admin_login'))
+    from flask import Response, stream_with_context
+    from utils.bulk_tickets import paid_bookings
+    from utils.booking_index import normalize
+    from utils.ticket_utils import PRINT_LAYOUTS, iter_ticket_batch_pdf
+    layout = request.args.get('layout', 'page')
+    if layout not in PRINT_LAYOUTS:
+        return jsonify({'success': False, 'message': f"layout must be one of: {', '.join(PRINT_LAYOUTS)}"}), 400
+    wanted = {normalize(t) for t in request.args.get('ticket_id', '').split(',') if t.strip()}
+    entry_status = request.args.get('entry_status', '').strip()
+
+    def selected():
+        for booking in paid_bookings():
+            if wanted and normalize(booking['ticket_id']) not in wanted:
+                continue
+            if entry_status and (booking.get('entry_status') or 'Not Used') != entry_status:
+                continue
+            yield booking
+
+    return Response(stream_with_context(iter_ticket_batch_pdf(selected(), layout)), mimetype='application/pdf',
+                    headers={'Content-Disposition': f'inline; filename=holi_party_tickets_{layout}.pdf'})
+
+def _bundle_status(job):
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'message': job.get('message', ''),
+        'result': job.get('result'),
+        'download_url': url_for('admin_ticket_bundle_download') if job['status'] == 'ready' else None,
+    }
+
+def _export_status(job):
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'message': job.get('message', ''),
+        'result': job.get('result'),
+        'download_url': url_for('admin_export_download', job_id=job['id']) if job['status'] == 'ready' else None,
+    }
+
 if __name__ == '__main__':
     app.run(debug=True)
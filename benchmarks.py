@@ -0,0 +1,356 @@
+"""
+Micro-benchmarks for hot paths. Run from the project root, e.g.:
+
+    python benchmarks.py tickets --count 500
+    python benchmarks.py email --count 2000
+    python benchmarks.py transports --count 200
+    python benchmarks.py checkin --count 5000 --gates 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _sample_bookings(count):
+    pass_types = ('entry', 'entry_starter', 'entry_starter_lunch')
+    return [{
+        'name': f'Guest {i}',
+        'ticket_id': f'SPH-BENCH{i:05d}',
+        'amount': 200 * (1 + i % 4),
+        'passes': 1 + i % 4,
+        'pass_type': pass_types[i % 3],
+        'is_group_booking': i % 4 == 3,
+        'venue': 'Kunjachaya, Bhadreswar',
+        'event_date': 'March 3, 2026',
+    } for i in range(count)]
+
+
+def _rate(label, count, fn, unit='tickets'):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    per_sec = count / elapsed if elapsed else float('inf')
+    print(f"  {label:<32} {per_sec:9.1f} {unit}/sec  ({elapsed * 1000 / count:.2f} ms each)")
+    return per_sec
+
+
+def _original_ticket_pdf(booking):
+    """
+    generate_ticket_pdf as it was before the ticket work (the baseline to beat): the QR is
+    rasterized to a PNG, saved to a temp file and embedded, and the whole page is drawn with FPDF.
+    """
+    from fpdf import FPDF
+    from PIL import Image
+    from utils.qr_utils import generate_qr
+    from utils.ticket_utils import _pass_label, _ticket_amount
+
+    fd, qr_path = tempfile.mkstemp(suffix='.png')
+    os.close(fd)
+    try:
+        Image.open(generate_qr(booking.get('ticket_id', 'N/A'))).save(qr_path, format='PNG')
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.set_font("Arial", 'B', 18)
+        pdf.set_text_color(255, 47, 146)
+        pdf.cell(0, 12, txt="SPECTRA HOLIPARTY 2026", ln=1, align='C')
+        pdf.set_font("Arial", '', 12)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(0, 8, txt="Entry Ticket", ln=1, align='C')
+        pdf.ln(5)
+        pdf.set_draw_color(255, 47, 146)
+        pdf.set_line_width(1)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+        pdf.ln(8)
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(0, 8, txt=f"Name: {booking['name']}", ln=1)
+        pdf.set_font("Arial", 'B', 13)
+        pdf.set_text_color(0, 100, 0)
+        pdf.cell(0, 8, txt=f"Ticket ID: {booking['ticket_id']}", ln=1)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_fill_color(255, 212, 0)
+        pdf.set_font("Arial", 'B', 14)
+        pdf.cell(0, 10, txt=f"Amount Paid: Rs. {_ticket_amount(booking)}", ln=1, fill=True)
+        pdf.set_font("Arial", '', 11)
+        pdf.cell(0, 6, txt=f"Passes: {booking['passes']} | Type: {_pass_label(booking)}", ln=1)
+        pdf.cell(0, 6, txt=f"Date: {booking['event_date']} | Time: 10:00 AM - 5:00 PM", ln=1)
+        pdf.cell(0, 6, txt=f"Venue: {booking['venue']}", ln=1)
+        pdf.cell(0, 6, txt="Complimentary: Abir & Special Lassi", ln=1)
+        pdf.ln(5)
+        y_pos = pdf.get_y()
+        pdf.image(qr_path, x=75, y=y_pos, w=60)
+        pdf.set_y(y_pos + 65)
+        pdf.set_font("Arial", 'I', 8)
+        pdf.set_text_color(128, 128, 128)
+        pdf.cell(0, 5, txt="Show this ticket at the gate. Organized by Spectra Group - 2nd Year of HoliParty!", ln=1, align='C')
+        out = pdf.output(dest='S')
+        return io.BytesIO(out.encode('latin-1') if isinstance(out, str) else out)
+    finally:
+        os.unlink(qr_path)
+
+
+def bench_tickets(args):
+    """
+    Ticket PDF rendering: the original generate_ticket_pdf (PNG QR, full redraw) vs. the current
+    render path (vector QR on a prebuilt skeleton), with the ticket cache bypassed.
+    """
+    from utils.qr_utils import qr_matrix
+    from utils.ticket_utils import TicketSkeleton, _render_ticket_pdf, get_ticket_skeleton
+
+    bookings = _sample_bookings(args.count)
+    get_ticket_skeleton('Kunjachaya, Bhadreswar', 'March 3, 2026')  # warm up
+    _original_ticket_pdf(bookings[0])
+    print(f"Rendering {args.count} tickets (end to end)")
+    before = _rate('original generate_ticket_pdf', args.count, lambda: [_original_ticket_pdf(b) for b in bookings])
+    after = _rate('skeleton + overlay', args.count, lambda: [_render_ticket_pdf(b) for b in bookings])
+    print(f"  speedup: {after / before:.2f}x")
+
+    matrices = {}
+    print("QR encoding alone")
+    _rate('qr_matrix', args.count, lambda: matrices.update(
+        (b['ticket_id'], qr_matrix(b['ticket_id'])) for b in bookings))
+
+    print("Layout only (QR pre-encoded): skeleton vs. a full redraw of the same page")
+    before = _rate('full redraw', args.count, lambda: [
+        _render_ticket_pdf(b, skeleton=TicketSkeleton(b['venue'], b['event_date']), matrix=matrices[b['ticket_id']])
+        for b in bookings])
+    after = _rate('skeleton + overlay', args.count, lambda: [
+        _render_ticket_pdf(b, matrix=matrices[b['ticket_id']]) for b in bookings])
+    print(f"  speedup: {after / before:.2f}x")
+
+
+def bench_email(args):
+    """Confirmation email HTML rendering for a batch send against one event content."""
+    from utils.email_utils import create_success_email_template
+
+    # The repo's sample content, whatever directory the benchmark is run from
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'event_content.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        from models import EventContent  # only here: importing models opens the booking journal
+        content = EventContent.DEFAULT_CONTENT
+    bookings = _sample_bookings(args.count)
+    create_success_email_template(bookings[0], content)  # warm up (fragments)
+    print(f"Rendering {args.count} confirmation emails")
+    _rate('create_success_email_template', args.count,
+          lambda: [create_success_email_template(b, content) for b in bookings], unit='emails')
+
+
+class _StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH, MAIL/RCPT/DATA, RSET, NOOP, QUIT."""
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode('ascii', 'replace').strip().upper()
+            if cmd.startswith('EHLO'):
+                self.wfile.write(b'250-stub\r\n250 AUTH PLAIN LOGIN\r\n')
+            elif cmd.startswith('AUTH'):
+                self.reply('235 ok')
+            elif cmd == 'DATA':
+                self.reply('354 go ahead')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.reply('250 queued')
+            elif cmd == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class _StubHTTPHandler(BaseHTTPRequestHandler):
+    """Accepts any POST with a provider-style JSON reply, keeping the connection alive."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = b'{"id": "stub"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def bench_transports(args):
+    """send_email throughput per provider against local stub servers: pooled vs. connection per message."""
+    import requests
+    from config import Config
+    from utils import email_utils
+
+    class _SMTPServer(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    smtp_port = _serve(_SMTPServer(('127.0.0.1', 0), _StubSMTPHandler))
+    http_port = _serve(ThreadingHTTPServer(('127.0.0.1', 0), _StubHTTPHandler))
+    stub_url = f'http://127.0.0.1:{http_port}'
+    for name, value in {
+        'SMTP_HOST': '127.0.0.1', 'SMTP_PORT': smtp_port, 'SMTP_STARTTLS': False,
+        'EMAIL_USER': 'bench@example.com', 'EMAIL_PASS': 'x',
+        'RESEND_API_URL': stub_url, 'RESEND_API_KEY': 're_bench', 'RESEND_FROM_EMAIL': 'bench@example.com',
+        'SENDGRID_API_URL': stub_url, 'SENDGRID_API_KEY': 'SG.bench', 'EMAIL_FROM': 'bench@example.com',
+        'MAILGUN_API_URL': stub_url, 'MAILGUN_API_KEY': 'key', 'MAILGUN_DOMAIN': 'example.com',
+    }.items():
+        setattr(Config, name, value)
+
+    body = '<p>' + 'x' * 20000 + '</p>'  # about the size of a confirmation email
+    attachment = b'%PDF' + b'0' * 2200  # about the size of a ticket
+
+    def run(provider):
+        Config.EMAIL_PROVIDER = provider
+        for _ in range(args.count):
+            assert email_utils.send_email('guest@example.com', 'Bench', body, io.BytesIO(attachment))
+
+    pooled_smtp, pooled_http = email_utils.smtp_pool, email_utils._get_http_session
+    print(f"Sending {args.count} emails per provider to local stubs")
+    for provider in ('smtp', 'resend', 'sendgrid', 'mailgun'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Connection per email, as before pooling: no idle SMTP connections kept,
+            # module-level requests.* calls instead of the shared session
+            email_utils.smtp_pool = email_utils.SmtpPool(max_idle=0)
+            email_utils._get_http_session = lambda: requests
+            before = _time_rate(args.count, lambda: run(provider))
+            email_utils.smtp_pool, email_utils._get_http_session = pooled_smtp, pooled_http
+            after = _time_rate(args.count, lambda: run(provider))
+        print(f"  {provider:<10} per-email connection {before:8.1f}/s   pooled {after:8.1f}/s   ({after / before:.2f}x)")
+    print(f"  SMTP connections opened by the pool: {email_utils.smtp_pool.connects}")
+    email_utils.close_email_transports()
+
+
+def _time_rate(count, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    return count / elapsed if elapsed else float('inf')
+
+
+def bench_checkin(args):
+    """
+    Gate check-in load test: `gates` threads POST /checkin through the Flask app for `count`
+    paid tickets, re-scanning `dupes` of them at another gate at the same time. Every ticket
+    must be admitted exactly once.
+    Runs against a throwaway DATA_DIR even when one is configured, so the fake Paid bookings
+    never touch the real bookings.db or write-behind journal; the queue has no flush function
+    and the index no loader, so nothing is read from or written to the Sheet or MongoDB.
+    """
+    data_dir = tempfile.mkdtemp(prefix='checkin_bench_')
+    os.environ['DATA_DIR'] = data_dir
+    from app import app
+    from config import Config
+    from models import Booking
+    from utils.booking_index import booking_index
+    from utils.write_queue import write_queue
+
+    if Config.DATA_DIR != data_dir or os.path.dirname(write_queue.journal_path) != data_dir:
+        raise SystemExit("checkin benchmark: app was configured before DATA_DIR could be redirected; aborting")
+    write_queue.set_flush_fn(None)
+    bookings = _sample_bookings(args.count)
+    for b in bookings:
+        b.update(payment_status='Paid', entry_status='Not Used')
+    store = Booking.local_store()
+    for b in bookings:
+        store.insert(b)
+    booking_index.set_loader(lambda: [dict(b) for b in bookings])
+    booking_index.rebuild(bookings)
+    Config.GATE_TOKEN = 'bench'
+
+    rng = random.Random(7)
+    scans = [b['ticket_id'] for b in bookings]
+    scans += rng.sample(scans, min(args.dupes, len(scans)))
+    rng.shuffle(scans)
+    per_gate = [scans[g::args.gates] for g in range(args.gates)]
+    results = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def gate(g):
+        client = app.test_client()
+        local = []
+        for ticket_id in per_gate[g]:
+            started = time.perf_counter()
+            r = client.post('/checkin', json={'ticket_id': ticket_id, 'gate': f'Gate {g + 1}'},
+                            headers={'X-Gate-Token': 'bench'})
+            local.append((time.perf_counter() - started, r.get_json()['result']))
+        with lock:
+            for elapsed, result in local:
+                latencies.append(elapsed)
+                results[result] = results.get(result, 0) + 1
+
+    print(f"{len(scans)} scans ({args.dupes} duplicates) across {args.gates} gates")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=gate, args=(g,)) for g in range(args.gates)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f"  throughput  {len(scans) / elapsed:9.1f} scans/sec")
+    print(f"  latency     p50 {pct(0.5):.2f} ms  p99 {pct(0.99):.2f} ms  max {latencies[-1] * 1000:.2f} ms")
+    print(f"  results     {results}")
+    used = sum(1 for b in booking_index.all() if b.get('entry_status') == 'Used')
+    ok = results.get('admitted') == args.count == used and results.get('already_used', 0) == len(scans) - args.count
+    print(f"  every ticket admitted exactly once: {'yes' if ok else 'NO'}")
+    print(f"  write-behind queue depth: {len(write_queue)} (never flushed; discarded with {data_dir})")
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spectra HoliParty benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('tickets', help='ticket PDF rendering throughput')
+    p.add_argument('--count', type=int, default=300)
+    p.set_defaults(func=bench_tickets)
+
+    p = sub.add_parser('email', help='confirmation email rendering throughput')
+    p.add_argument('--count', type=int, default=2000)
+    p.set_defaults(func=bench_email)
+
+    p = sub.add_parser('transports', help='email provider transports against local stub servers')
+    p.add_argument('--count', type=int, default=200)
+    p.set_defaults(func=bench_transports)
+
+    p = sub.add_parser('checkin', help='gate check-in load test (several gates, duplicate scans)')
+    p.add_argument('--count', type=int, default=5000)
+    p.add_argument('--gates', type=int, default=8)
+    p.add_argument('--dupes', type=int, default=500)
+    p.set_defaults(func=bench_checkin)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
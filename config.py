@@ -31,6 +31,16 @@ class Config:
     MAILGUN_API_KEY = (os.environ.get('MAILGUN_API_KEY') or '').strip()
     MAILGUN_DOMAIN = (os.environ.get('MAILGUN_DOMAIN') or '').strip()
     
+    # Provider API base URLs (override for a regional endpoint, e.g. https://api.eu.mailgun.net)
+    RESEND_API_URL = (os.environ.get('RESEND_API_URL') or 'https://api.resend.com').strip().rstrip('/')
+    SENDGRID_API_URL = (os.environ.get('SENDGRID_API_URL') or 'https://api.sendgrid.com').strip().rstrip('/')
+    MAILGUN_API_URL = (os.environ.get('MAILGUN_API_URL') or 'https://api.mailgun.net').strip().rstrip('/')
+
+    # SMTP connections are kept open and reused; one idle longer than SMTP_IDLE_TIMEOUT seconds
+    # is closed instead (servers drop idle clients). SMTP_STARTTLS=false for plain/local relays.
+    SMTP_STARTTLS = (os.environ.get('SMTP_STARTTLS') or 'true').strip().lower() not in ('0', 'false', 'no')
+    SMTP_IDLE_TIMEOUT = float(os.environ.get('SMTP_IDLE_TIMEOUT') or 60)
+
     # Common email from address (used by sendgrid, mailgun)
     EMAIL_FROM = (os.environ.get('EMAIL_FROM') or '').strip()
     # Contact form submissions are sent to this inbox
@@ -38,11 +48,69 @@ class Config:
     GOOGLE_SHEET_ID = os.environ.get('GOOGLE_SHEET_ID') or '13oh5EqMrsnNOqCGqKzDNzHgy4p9gRGXz6JDVK7XyKew'
     GOOGLE_CREDS_PATH = os.environ.get('GOOGLE_CREDS_PATH') or 'creds.json'
 
-    # Where to store JSON fallback files (bookings.json, event_content.json).
+    # Where to store local fallback files (bookings.db / bookings.json, event_content.json).
     # On Render free tier this remains ephemeral. If you attach a disk, set:
     # DATA_DIR=/var/data (and mount a disk there).
     DATA_DIR = (os.environ.get('DATA_DIR') or '').strip()
 
+    # Local booking tier behind Sheet/Mongo: 'sqlite' (DATA_DIR/bookings.db, WAL; bookings.json is
+    # imported on first start) or 'json' (the whole list rewritten to bookings.json on every change).
+    LOCAL_STORE = (os.environ.get('LOCAL_STORE') or 'sqlite').strip().lower()
+
+    # JSON fallback files are written without whitespace (via orjson when installed).
+    # JSON_COMPACT=false writes them indented, for editing event_content.json by hand.
+    JSON_COMPACT = (os.environ.get('JSON_COMPACT') or 'true').strip().lower() not in ('0', 'false', 'no')
+
+    # Event content is cached per worker; a save bumps its version, and every worker compares
+    # the stored version (a projected Mongo read or a file stat) at most this often.
+    CONTENT_VERSION_CHECK_SECONDS = float(os.environ.get('CONTENT_VERSION_CHECK_SECONDS') or 5)
+
+    # /, /about and /contact are rendered once per content version and served from memory
+    # (with ETag / 304 and gzip or brotli). PAGE_CACHE_ENABLED=false renders on every request.
+    PAGE_CACHE_ENABLED = (os.environ.get('PAGE_CACHE_ENABLED') or 'true').strip().lower() not in ('0', 'false', 'no')
+
+    # In-memory booking index (Booking.find_one) is reloaded from the stores this often.
+    # Set to 0 to disable the background refresh.
+    BOOKING_INDEX_REFRESH_SECONDS = int(os.environ.get('BOOKING_INDEX_REFRESH_SECONDS') or 60)
+
+    # New bookings are written to Google Sheet / MongoDB by a background flusher that batches
+    # rows every WRITE_BEHIND_FLUSH_SECONDS. Set WRITE_BEHIND_ENABLED=false to write inline.
+    WRITE_BEHIND_ENABLED = (os.environ.get('WRITE_BEHIND_ENABLED') or 'true').strip().lower() not in ('0', 'false', 'no')
+    WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get('WRITE_BEHIND_FLUSH_SECONDS') or 0.3)
+    # A booking whose flush failed this many times is parked (kept in the journal, shown on
+    # /admin/health) until it changes again or the worker restarts.
+    WRITE_BEHIND_MAX_ATTEMPTS = int(os.environ.get('WRITE_BEHIND_MAX_ATTEMPTS') or 10)
+
+    # Circuit breakers for MongoDB, Google Sheets and email: after BREAKER_FAILURE_THRESHOLD
+    # consecutive failures a backend is skipped for BREAKER_COOLDOWN seconds; a background probe
+    # (every HEALTH_PROBE_SECONDS) checks whether it is back before traffic resumes.
+    BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD') or 3)
+    BREAKER_COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN') or 30)
+    HEALTH_PROBE_SECONDS = float(os.environ.get('HEALTH_PROBE_SECONDS') or 10)
+
+    # Ticket PDFs and emails are sent by background jobs.
+    # JOB_BACKEND='thread' runs them in a JOB_WORKERS-sized pool inside the web process;
+    # 'store' records them in DATA_DIR/jobs.db for a separate `python -m utils.jobs` worker.
+    JOB_BACKEND = (os.environ.get('JOB_BACKEND') or 'thread').strip().lower()
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+
+    # Processes used to pre-render every paid ticket into the downloadable bundle. 0 = the CPUs this
+    # process may run on, capped at 2 (each worker re-imports fpdf/qrcode/app modules: ~512MB instances).
+    TICKET_BUNDLE_WORKERS = int(os.environ.get('TICKET_BUNDLE_WORKERS') or 0)
+
+    # Gate scanners call POST /checkin with this value in the X-Gate-Token header.
+    # Unset: only a logged-in admin session can check tickets in.
+    GATE_TOKEN = (os.environ.get('GATE_TOKEN') or '').strip()
+
+    # Admin exports run as background jobs; built files are kept in DATA_DIR/exports keyed by the
+    # bookings' data version (repeat exports of unchanged data are served from there).
+    EXPORT_CACHE_KEEP = int(os.environ.get('EXPORT_CACHE_KEEP') or 6)
+
+    # Rendered ticket PDFs are cached by their printed fields: TICKET_CACHE_SIZE entries in memory,
+    # plus DATA_DIR/ticket_cache on disk when DATA_DIR is set (TICKET_DISK_CACHE=false to disable).
+    TICKET_CACHE_SIZE = int(os.environ.get('TICKET_CACHE_SIZE') or 256)
+    TICKET_DISK_CACHE = (os.environ.get('TICKET_DISK_CACHE') or 'true').strip().lower() not in ('0', 'false', 'no')
+
     # Admin Login Credentials
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME') or 'admin'
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD') or 'holi2026'
\ No newline at end of file
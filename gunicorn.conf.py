@@ -11,3 +11,19 @@ keepalive = 5
 max_requests = 500
 max_requests_jitter = 50
 preload = True
+
+
+def post_fork(server, worker):
+    # Background threads started in the preloading master don't survive fork
+    from utils.write_queue import write_queue
+    write_queue.start()
+
+
+def worker_exit(server, worker):
+    # max_requests recycles workers; push pending booking writes and queued emails out before exiting
+    from utils.write_queue import write_queue
+    from utils.jobs import job_queue
+    from utils.email_utils import close_email_transports
+    write_queue.drain()
+    job_queue.shutdown()
+    close_email_transports()
@@ -1,13 +1,46 @@
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, WriteError
 from config import Config
+from utils.booking_index import booking_index, normalize
+from utils.health import backend_health
+from utils.write_queue import write_queue
 import json
 import os
 import tempfile
+import threading
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # optional: json module fallback
+    orjson = None
+
 # Singleton MongoDB client - reuse connection across requests
 _mongo_client = None
-_mongo_disabled_until = 0  # epoch seconds; backoff when Mongo is failing
+
+# Data errors say nothing about whether Mongo is reachable
+MONGO_DATA_ERRORS = (DuplicateKeyError, WriteError, BulkWriteError)
+
+# Indexes behind the Mongo query paths: lookups/updates/deletes by ticket_id (and order_id),
+# admin + moderation filters on payment/entry status, newest bookings first
+BOOKING_INDEXES = [
+    ([('ticket_id', ASCENDING)], {'name': 'ticket_id_unique', 'unique': True}),
+    ([('order_id', ASCENDING)], {'name': 'order_id'}),
+    ([('payment_status', ASCENDING), ('booking_date', DESCENDING)], {'name': 'payment_status_booking_date'}),
+    ([('entry_status', ASCENDING), ('booking_date', DESCENDING)], {'name': 'entry_status_booking_date'}),
+]
+
+# Hot filters whose query plans are checked once the indexes exist: name -> (filter, sort)
+HOT_QUERIES = {
+    'ticket_id': ({'ticket_id': 'PLAN-CHECK'}, None),
+    'order_id': ({'order_id': 'PLAN-CHECK'}, None),
+    'payment_status': ({'payment_status': 'Pending'}, [('booking_date', DESCENDING)]),
+    'entry_status': ({'entry_status': 'Not Used'}, [('booking_date', DESCENDING)]),
+}
+
+# name -> {'stages': [...], 'indexed': bool}; filled by the index bootstrap (shown on /admin/health)
+mongo_query_plans = {}
+_mongo_bootstrapped = False
 
 def _data_path(filename: str) -> str:
     base = getattr(Config, "DATA_DIR", "") or ""
@@ -20,6 +53,52 @@ def _data_path(filename: str) -> str:
         return os.path.join(base, filename)
     return filename
 
+# path -> ((mtime_ns, size, inode), parsed document); see _load_json_cached
+_json_docs = {}
+_json_docs_lock = threading.Lock()
+
+def _dump_json(payload) -> bytes:
+    """JSON_COMPACT: no whitespace (orjson when installed); otherwise indented for hand editing."""
+    compact = getattr(Config, "JSON_COMPACT", True)
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(payload, default=str, option=option)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits: let the json module handle it
+    if compact:
+        return json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return json.dumps(payload, indent=2, default=str).encode("utf-8")
+
+def _load_json_cached(path: str):
+    """
+    Parsed JSON at path, re-parsed only when the file's (mtime_ns, size, inode) changes.
+    The document is shared by every caller: treat it as read-only and copy before mutating.
+    Raises OSError / ValueError like open() + json.load().
+    """
+    st = os.stat(path)
+    cached = _json_docs.get(path)
+    if cached is not None and cached[0] == (st.st_mtime_ns, st.st_size, st.st_ino):
+        return cached[1]
+    with open(path, "rb") as f:
+        # Stamp from the open file, so a concurrent replace can't pair new content with an old stamp
+        st = os.fstat(f.fileno())
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    with _json_docs_lock:
+        _json_docs[path] = ((st.st_mtime_ns, st.st_size, st.st_ino), data)
+    return data
+
+def _file_stamp(path: str):
+    """(mtime_ns, size, inode) of path, or None when it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
 def _atomic_write_json(path: str, payload):
     """Write JSON atomically to avoid partial/corrupt files."""
     d = os.path.dirname(path) or "."
@@ -29,10 +108,12 @@ def _atomic_write_json(path: str, payload):
         pass
     fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=d)
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, default=str)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_dump_json(payload))
         os.replace(tmp_path, path)
     finally:
+        with _json_docs_lock:
+            _json_docs.pop(path, None)
         try:
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
@@ -80,16 +161,13 @@ def _strip_mongo_id(doc):
     return doc
 
 def _get_client():
-    global _mongo_client
-    global _mongo_disabled_until
+    # When Mongo is down (TLS, network, auth) its circuit is open: skip it without blocking
+    if not backend_health.allow('mongo'):
+        return None
+    return _create_client()
 
-    # When Mongo is down (TLS, network, auth), avoid blocking every request.
-    try:
-        import time
-        if _mongo_disabled_until and time.time() < _mongo_disabled_until:
-            return None
-    except Exception:
-        pass
+def _create_client():
+    global _mongo_client
 
     if _mongo_client is None:
         try:
@@ -115,15 +193,155 @@ def _get_client():
                 tls=True,
                 **tls_kwargs,
             )
-            # Re-enable Mongo on successful client init
-            try:
-                _mongo_disabled_until = 0
-            except Exception:
-                pass
+            _start_mongo_bootstrap(_mongo_client)
         except Exception:
             pass
     return _mongo_client
 
+def _start_mongo_bootstrap(client):
+    """Create indexes and check query plans once, off the request path."""
+    global _mongo_bootstrapped
+    if _mongo_bootstrapped:
+        return
+    _mongo_bootstrapped = True
+    threading.Thread(target=_bootstrap_mongo, args=(client,), name='mongo-index-bootstrap', daemon=True).start()
+
+def _bootstrap_mongo(client):
+    try:
+        with _track_mongo():
+            collection = client.holi_party.bookings
+            _ensure_booking_indexes(collection)
+            _check_query_plans(collection)
+    except Exception as e:
+        print(f"MongoDB index bootstrap failed (non-fatal): {e}")
+
+def _ensure_booking_indexes(collection):
+    for keys, options in BOOKING_INDEXES:
+        try:
+            collection.create_index(keys, **options)
+        except DuplicateKeyError:
+            # Existing duplicate ticket IDs: keep lookups fast without the constraint
+            print(f"WARNING: duplicate values for {keys[0][0]} in MongoDB bookings; creating a non-unique index")
+            collection.create_index(keys, name=keys[0][0])
+        except OperationFailure as e:
+            # 85/86: the same keys are already indexed under another name/options
+            if e.code not in (85, 86):
+                raise
+
+def _check_query_plans(collection):
+    for name, (query, sort) in HOT_QUERIES.items():
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = _plan_stages(cursor.explain().get('queryPlanner', {}).get('winningPlan', {}))
+        indexed = 'COLLSCAN' not in stages
+        mongo_query_plans[name] = {'stages': stages, 'indexed': indexed}
+        if not indexed:
+            print(f"WARNING: MongoDB query on bookings.{name} is a collection scan ({' > '.join(stages)}); "
+                  f"check the bookings indexes")
+
+def _plan_stages(plan):
+    """Stage names of a winning plan, outermost first (classic and SBE explain formats)."""
+    stages = []
+    while isinstance(plan, dict) and plan:
+        plan = plan.get('queryPlan', plan)
+        if plan.get('stage'):
+            stages.append(plan['stage'])
+        children = plan.get('inputStages') or [plan.get('inputStage')]
+        for child in children[1:]:
+            stages.extend(_plan_stages(child))
+        plan = children[0]
+    return stages
+
+def _track_mongo():
+    """Record the outcome of a MongoDB call on the 'mongo' circuit breaker (exceptions re-raised)."""
+    return backend_health.track('mongo', ignore=MONGO_DATA_ERRORS)
+
+def _ping_mongo():
+    """Health probe for an open 'mongo' circuit (requests themselves no longer ping)."""
+    client = _create_client()
+    if client is None:
+        raise RuntimeError('MongoDB client unavailable')
+    client.admin.command('ping')
+
+class JsonBookingStore:
+    """
+    The original local tier: every booking in one JSON list (bookings.json).
+    Each write reloads and rewrites the whole file; kept for LOCAL_STORE=json.
+    Reads come from the parsed-document cache, so an unchanged file is parsed once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _matches(self, booking, criteria):
+        return all(str(booking.get(k, '')).strip().upper() == str(v).strip().upper() for k, v in criteria.items())
+
+    def _shared(self):
+        """The cached list itself (read-only)."""
+        try:
+            data = _load_json_cached(self.path)
+        except Exception:
+            return []
+        return data if isinstance(data, list) else []
+
+    def all(self):
+        # Fresh list and booking dicts: callers (index rebuild, admin) may hold on to or change them
+        return [dict(b) for b in self._shared()]
+
+    def insert(self, booking):
+        bookings = list(self._shared())
+        bookings.append(booking)
+        _atomic_write_json(self.path, bookings)
+
+    def find_one(self, **criteria):
+        for booking in self._shared():
+            if self._matches(booking, criteria):
+                return dict(booking)
+        return None
+
+    def update_one(self, filter_dict, fields):
+        bookings = list(self._shared())
+        for i, booking in enumerate(bookings):
+            if self._matches(booking, filter_dict):
+                bookings[i] = {**booking, **fields}
+                _atomic_write_json(self.path, bookings)
+                return True
+        return False
+
+    def update_many(self, ticket_ids, fields):
+        keys = {str(t).strip().upper() for t in ticket_ids}
+        bookings = list(self._shared())
+        changed = 0
+        for i, booking in enumerate(bookings):
+            if str(booking.get('ticket_id', '')).strip().upper() in keys:
+                bookings[i] = {**booking, **fields}
+                changed += 1
+        if changed:
+            _atomic_write_json(self.path, bookings)
+        return changed
+
+    def delete_one(self, filter_dict):
+        bookings = list(self._shared())
+        for i, booking in enumerate(bookings):
+            if self._matches(booking, filter_dict):
+                bookings.pop(i)
+                _atomic_write_json(self.path, bookings)
+                return True
+        return False
+
+def _local_store_from_config(json_path):
+    """LOCAL_STORE=sqlite (default): DATA_DIR/bookings.db, importing bookings.json once. json: the JSON file."""
+    if (getattr(Config, 'LOCAL_STORE', 'sqlite') or 'sqlite').strip().lower() == 'sqlite':
+        try:
+            from utils.booking_store import SqliteBookingStore
+            store = SqliteBookingStore(_data_path('bookings.db'))
+            store.migrate_from_json(json_path)
+            return store
+        except Exception as e:
+            print(f"SQLite booking store unavailable, using {json_path}: {e}")
+    return JsonBookingStore(json_path)
+
 class EventContent:
     # Use JSON file as fallback when MongoDB is not available
     JSON_FILE = _data_path('event_content.json')
@@ -158,106 +376,157 @@ class EventContent:
 
     _content_cache = None
     _cache_time = 0
-    CACHE_TTL = 300  # seconds (admin updates invalidate cache immediately)
+    # ('mongo', _version) or ('json', file stamp) of the cached document, and when it was last compared
+    _cache_version = None
+    _checked_at = 0
+    CACHE_TTL = 300  # seconds; backstop only, saves are picked up by the version check
+    VERSION_CHECK_INTERVAL = float(getattr(Config, 'CONTENT_VERSION_CHECK_SECONDS', 5) or 0)
 
     @classmethod
     def get_collection(cls):
-        try:
-            client = _get_client()
-            if client:
-                client.admin.command('ping')
-                return client.holi_party.event_content
-        except Exception as e:
-            print(f"MongoDB not available, using JSON fallback: {e}")
-            # Backoff to keep website responsive if Mongo is down
-            try:
-                import time
-                global _mongo_disabled_until
-                _mongo_disabled_until = time.time() + 60
-            except Exception:
-                pass
-        return None
+        # No ping here: failures are tracked per call and an open circuit returns None
+        client = _get_client()
+        return client.holi_party.event_content if client else None
 
     @classmethod
     def get_content(cls):
+        """
+        Cached content. Every VERSION_CHECK_INTERVAL seconds the stored version is compared
+        with the cached one, so a save in any worker or instance is seen by all of them
+        within that interval; the full document is only fetched again when it changed.
+        """
         import time
         now = time.time()
-        if cls._content_cache and (now - cls._cache_time) < cls.CACHE_TTL:
-            return cls._content_cache
+        content = cls._content_cache
+        if content and (now - cls._cache_time) < cls.CACHE_TTL:
+            if now - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+                return content
+            if cls._cache_version is not None and cls._stored_version() == cls._cache_version:
+                cls._checked_at = now
+                return content
+        return cls._fetch(now)
+
+    @classmethod
+    def _fetch(cls, now):
         collection = cls.get_collection()
         if collection is not None:
-            content = collection.find_one()
+            try:
+                with _track_mongo():
+                    content = collection.find_one()
+            except Exception as e:
+                print(f"MongoDB not available, using JSON fallback: {e}")
+                collection = None
+        if collection is not None:
             if content:
-                cls._content_cache = content
-                cls._cache_time = now
+                cls._remember(content, ('mongo', content.get('_version', 0)), now)
                 return content
             else:
-                cls.save_content(cls.DEFAULT_CONTENT)
-                cls._content_cache = cls.DEFAULT_CONTENT
-                cls._cache_time = now
+                cls._save_content(cls.DEFAULT_CONTENT)
+                # Version unknown: the next check fetches the saved document
+                cls._remember(cls.DEFAULT_CONTENT, None, now)
                 return cls.DEFAULT_CONTENT
         else:
-            # Cache JSON fallback too (avoids repeated DB attempts on each request)
+            # Cache JSON fallback too (avoids repeated DB attempts on each request).
+            # Stamp taken before the read: a save in between only causes one extra reload.
+            stamp = _file_stamp(cls.JSON_FILE)
             content = cls._load_from_json()
-            cls._content_cache = content
-            cls._cache_time = now
+            cls._remember(content, ('json', stamp) if stamp else None, now)
             return content
 
+    @classmethod
+    def _remember(cls, content, version, now):
+        cls._content_cache = content
+        cls._cache_version = version
+        cls._cache_time = now
+        cls._checked_at = now
+
+    @classmethod
+    def _stored_version(cls):
+        """Version of the stored content without fetching it (same tier order as _fetch)."""
+        collection = cls.get_collection()
+        if collection is not None:
+            try:
+                with _track_mongo():
+                    doc = collection.find_one({}, {'_version': 1})
+                return ('mongo', doc.get('_version', 0)) if doc else None
+            except Exception as e:
+                print(f"MongoDB content version check failed, using JSON fallback: {e}")
+        stamp = _file_stamp(cls.JSON_FILE)
+        return ('json', stamp) if stamp else None
+
     @classmethod
     def invalidate_cache(cls):
         cls._content_cache = None
+        cls._cache_version = None
         cls._cache_time = 0
+        cls._checked_at = 0
 
     @classmethod
     def save_content(cls, content):
+        before = cls.get_content() or {}
+        cls._save_content(content)
+        after = cls.get_content() or {}
+        # Venue and date are printed on every ticket; cached PDFs are stale once they change
+        if any(before.get(k) != after.get(k) for k in ('venue', 'event_date')):
+            try:
+                from utils.ticket_utils import clear_ticket_cache
+                clear_ticket_cache()
+            except Exception as e:
+                print(f"Ticket cache clear failed (non-fatal): {e}")
+
+    @classmethod
+    def _save_content(cls, content):
         collection = cls.get_collection()
         if collection is not None:
-            # Merge with existing record to avoid deleting previous data
-            existing = _strip_mongo_id(collection.find_one() or {})
-            merged = _deep_merge_keep_existing(existing, _strip_mongo_id(content or {}))
-            collection.replace_one({}, merged, upsert=True)
-            cls.invalidate_cache()
-        else:
-            # Merge with existing JSON to avoid deleting previous data
-            existing = cls._load_from_json() if os.path.exists(cls.JSON_FILE) else {}
-            existing = _strip_mongo_id(existing or {})
-            merged = _deep_merge_keep_existing(existing, _strip_mongo_id(content or {}))
-            _atomic_write_json(cls.JSON_FILE, merged)
-            cls.invalidate_cache()
+            try:
+                # Merge with existing record to avoid deleting previous data
+                with _track_mongo():
+                    existing = _strip_mongo_id(collection.find_one() or {})
+                    merged = _deep_merge_keep_existing(existing, _strip_mongo_id(content or {}))
+                    # Other workers compare this against their cached copy (see get_content)
+                    merged['_version'] = int(existing.get('_version') or 0) + 1
+                    collection.replace_one({}, merged, upsert=True)
+                cls.invalidate_cache()
+                return
+            except Exception as e:
+                print(f"MongoDB content save failed, using JSON fallback: {e}")
+        # Merge with existing JSON to avoid deleting previous data
+        existing = cls._load_from_json() if os.path.exists(cls.JSON_FILE) else {}
+        existing = _strip_mongo_id(existing or {})
+        merged = _deep_merge_keep_existing(existing, _strip_mongo_id(content or {}))
+        # Readers of the JSON tier go by the file stamp; the counter keeps saves distinguishable
+        merged['_version'] = int(existing.get('_version') or 0) + 1
+        _atomic_write_json(cls.JSON_FILE, merged)
+        cls.invalidate_cache()
 
     @classmethod
     def _load_from_json(cls):
+        # Shared parsed document (like _content_cache): callers must not mutate it
         if os.path.exists(cls.JSON_FILE):
             try:
-                with open(cls.JSON_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return _load_json_cached(cls.JSON_FILE)
             except Exception:
                 return cls.DEFAULT_CONTENT
         else:
-            cls.save_content(cls.DEFAULT_CONTENT)
+            cls._save_content(cls.DEFAULT_CONTENT)
             return cls.DEFAULT_CONTENT
 
+# Written by Booking.check_in; not Sheet columns (see Booking._attach_checkin_fields)
+CHECKIN_FIELDS = ('checked_in_at', 'checked_in_gate')
+
+def _admissible(booking):
+    return booking.get('payment_status') == 'Paid' and (booking.get('entry_status') or 'Not Used') == 'Not Used'
+
 class Booking:
     # Use JSON file as fallback when MongoDB is not available
     JSON_FILE = _data_path('bookings.json')
+    _local_store = None
 
     @classmethod
     def get_collection(cls):
-        try:
-            client = _get_client()
-            if client:
-                client.admin.command('ping')
-                return client.holi_party.bookings
-        except Exception as e:
-            print(f"MongoDB not available, using JSON fallback: {e}")
-            # Backoff to keep website responsive if Mongo is down
-            try:
-                import time
-                global _mongo_disabled_until
-                _mongo_disabled_until = time.time() + 60
-            except Exception:
-                pass
-        return None
+        # No ping here: failures are tracked per call and an open circuit returns None
+        client = _get_client()
+        return client.holi_party.bookings if client else None
 
     def __init__(self, name, email, phone, address, passes, ticket_id, order_id, payment_status='Pending', entry_status='Not Used', pass_type='entry', amount=None, is_group_booking=False, transaction_id='', pricing=None, **kwargs):
         self.name = name
@@ -279,38 +548,84 @@ class Booking:
         self.booking_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     def save(self):
-        # PRIMARY: Save to Google Sheet (persistent, reliable, free)
+        # Record locally first so the booking is visible (find_one, admin) immediately
+        # TERTIARY: local store (SQLite or JSON file; ephemeral on Render without a disk)
         try:
-            from utils.excel_utils import upsert_booking_row
-            sheet_saved = upsert_booking_row(self.__dict__)
-            if sheet_saved:
-                print(f"Booking {self.ticket_id} saved to Google Sheet")
+            self.local_store().insert(self.__dict__)
         except Exception as e:
-            print(f"Google Sheet save failed: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # SECONDARY: Try MongoDB (optional, can fail)
-        collection = self.get_collection()
+            print(f"Local store save failed (non-fatal): {e}")
+
+        booking_index.put(self.__dict__)
+
+        # PRIMARY (Google Sheet) + SECONDARY (MongoDB): batched by the write-behind flusher
+        if getattr(Config, 'WRITE_BEHIND_ENABLED', True):
+            write_queue.enqueue(self.__dict__)
+        else:
+            self._persist_remote([self.__dict__])
+
+    @classmethod
+    def _persist_remote(cls, bookings, updates=None):
+        """
+        Write booking snapshots to Google Sheet (one batched call) and MongoDB (one bulk upsert).
+        Tickets in `updates` ({ticket: fields}, from write_queue.enqueue_update) only get those
+        fields $set in Mongo: their snapshot comes from the index, which may have been loaded
+        from the Sheet and lack document fields such as address, order_id and pricing.
+        Returns False only when the Sheet write failed, so the write-behind queue retries it.
+        """
+        updates = updates or {}
+        from utils.excel_utils import sheets_configured
+        sheet_ok = True
+        # Without credentials there is no Sheet to write: retrying would only grow the queue
+        if sheets_configured():
+            try:
+                from utils.excel_utils import upsert_booking_rows
+                sheet_ok = upsert_booking_rows(bookings)
+                if sheet_ok:
+                    print(f"{len(bookings)} booking(s) saved to Google Sheet")
+            except Exception as e:
+                print(f"Google Sheet save failed: {e}")
+                import traceback
+                traceback.print_exc()
+                sheet_ok = False
+
+        collection = cls.get_collection()
         if collection is not None:
             try:
-                collection.insert_one(self.__dict__)
+                from pymongo import ReplaceOne, UpdateOne
+                ops = []
+                for b in bookings:
+                    if not b.get('ticket_id'):
+                        continue
+                    fields = updates.get(normalize(b['ticket_id']))
+                    if fields is None:
+                        ops.append(ReplaceOne({'ticket_id': b['ticket_id']}, _strip_mongo_id(b), upsert=True))
+                        continue
+                    update = {'$set': fields}
+                    # Missing from Mongo (e.g. written while it was down): insert what we have
+                    on_insert = {k: v for k, v in _strip_mongo_id(b).items() if k not in fields and k != 'ticket_id'}
+                    if on_insert:
+                        update['$setOnInsert'] = on_insert
+                    ops.append(UpdateOne({'ticket_id': b['ticket_id']}, update, upsert=True))
+                if ops:
+                    with _track_mongo():
+                        collection.bulk_write(ops, ordered=False)
             except Exception as e:
                 print(f"MongoDB save failed (non-fatal): {e}")
-        
-        # TERTIARY: Save to JSON file (local cache, ephemeral on Render)
-        try:
-            self._save_to_json()
-        except Exception as e:
-            print(f"JSON save failed (non-fatal): {e}")
+        return sheet_ok
 
-    def _save_to_json(self):
-        bookings = self._load_from_json()
-        bookings.append(self.__dict__)
-        _atomic_write_json(self.JSON_FILE, bookings)
+    @classmethod
+    def local_store(cls):
+        """The tertiary tier selected by LOCAL_STORE (created on first use)."""
+        if cls._local_store is None:
+            cls._local_store = _local_store_from_config(cls.JSON_FILE)
+        return cls._local_store
 
     @classmethod
     def find_one(cls, **kwargs):
+        # FAST PATH: in-memory index (no network call once warm)
+        if booking_index.can_answer(kwargs) and booking_index.ensure_loaded():
+            return booking_index.find_one(**kwargs)
+
         # PRIMARY: Search Google Sheet first (persistent, reliable)
         try:
             from utils.excel_utils import read_bookings_from_google_sheet
@@ -325,27 +640,83 @@ class Booking:
         collection = cls.get_collection()
         if collection is not None:
             try:
-                result = collection.find_one(kwargs)
+                with _track_mongo():
+                    result = collection.find_one(kwargs)
                 if result:
                     return result
             except Exception as e:
                 print(f"MongoDB find_one failed (non-fatal): {e}")
         
-        # TERTIARY: Check JSON file (local cache)
-        bookings = cls._load_from_json()
-        for booking in bookings:
-            if all(str(booking.get(k, '')).strip().upper() == str(v).strip().upper() for k, v in kwargs.items()):
-                return booking
-        
+        # TERTIARY: local store
+        try:
+            return cls.local_store().find_one(**kwargs)
+        except Exception as e:
+            print(f"Local store find_one failed: {e}")
         return None
 
     @classmethod
     def find_all(cls):
+        import time
+        started = time.time()
+        bookings = cls._load_all()
+        # Every full load doubles as an index refresh
+        booking_index.rebuild(bookings, started)
+        return bookings
+
+    @classmethod
+    def query(cls, filters=None, search='', sort='', offset=0, limit=50, fields=None, refresh=False):
+        """
+        A page of bookings served from the in-memory index (see BookingIndex.query).
+        refresh=True reloads the index from the stores first (the admin Refresh button).
+        """
+        if refresh:
+            cls.find_all()
+        booking_index.ensure_loaded()
+        return booking_index.query(filters=filters, search=search, sort=sort,
+                                   offset=offset, limit=limit, fields=fields)
+
+    @classmethod
+    def iter_all(cls):
+        """Every booking, streamed from the in-memory index (exports)."""
+        booking_index.ensure_loaded()
+        return booking_index.iter_all()
+
+    @classmethod
+    def data_version(cls):
+        """Fingerprint of the current bookings (export cache key)."""
+        booking_index.ensure_loaded()
+        return booking_index.data_version()
+
+    @classmethod
+    def stats(cls, pricing=None):
+        """
+        Dashboard figures from the index's running aggregates: total/paid/pending counts,
+        paid revenue (bookings without an amount priced from `pricing`) and passes.
+        """
+        booking_index.ensure_loaded()
+        stats = booking_index.stats()
+        pricing = pricing or {}
+        prices = {
+            'entry': pricing.get('entry_pass', 200),
+            'entry_starter': pricing.get('entry_plus_starter', 350),
+            'entry_starter_lunch': pricing.get('entry_plus_starter_lunch', 500),
+        }
+        by_payment = stats['by_payment_status']
+        stats['total'] = stats['count']
+        stats['paid'] = by_payment.get('Paid', 0)
+        stats['pending'] = by_payment.get('Pending', 0) + by_payment.get('Awaiting Verification', 0)
+        stats['total_revenue'] = sum(stats['revenue_by_pass_type'].values()) + sum(
+            passes * prices.get(pass_type, 200) for pass_type, passes in stats['unpriced_passes'].items())
+        return stats
+
+    @classmethod
+    def _load_all(cls):
         # PRIMARY: Load from Google Sheet (persistent, reliable)
         try:
             from utils.excel_utils import read_bookings_from_google_sheet
             sheet_data = read_bookings_from_google_sheet()
             if sheet_data:
+                cls._attach_checkin_fields(sheet_data)
                 return sheet_data
         except Exception as e:
             print(f"Google Sheet read failed: {e}")
@@ -354,33 +725,88 @@ class Booking:
         collection = cls.get_collection()
         if collection is not None:
             try:
-                mongo_data = list(collection.find())
+                with _track_mongo():
+                    mongo_data = list(collection.find())
                 if mongo_data:
                     return mongo_data
             except Exception as e:
                 print(f"MongoDB read failed (non-fatal): {e}")
         
-        # TERTIARY: Load from JSON file (local cache)
-        return cls._load_from_json()
+        # TERTIARY: local store
+        try:
+            return cls.local_store().all()
+        except Exception as e:
+            print(f"Local store read failed: {e}")
+            return []
+
+    @classmethod
+    def _attach_checkin_fields(cls, bookings):
+        """
+        The Sheet has no columns for when/where a ticket was checked in: copy them onto
+        Sheet-loaded bookings from MongoDB (or the local store when Mongo is unavailable).
+        """
+        used = {normalize(b.get('ticket_id')): b for b in bookings if b.get('entry_status') == 'Used'}
+        if not used:
+            return
+        found = None
+        collection = cls.get_collection()
+        if collection is not None:
+            try:
+                with _track_mongo():
+                    found = list(collection.find({'entry_status': 'Used'},
+                                                 {'_id': 0, 'ticket_id': 1, **{f: 1 for f in CHECKIN_FIELDS}}))
+            except Exception as e:
+                print(f"MongoDB check-in fields read failed (non-fatal): {e}")
+        if found is None:
+            try:
+                found = [b for b in cls.local_store().all() if b.get('entry_status') == 'Used']
+            except Exception as e:
+                print(f"Local store check-in fields read failed (non-fatal): {e}")
+                return
+        for doc in found:
+            booking = used.get(normalize(doc.get('ticket_id')))
+            if booking is not None:
+                for f in CHECKIN_FIELDS:
+                    if doc.get(f):
+                        booking[f] = doc[f]
 
     @classmethod
     def update_one(cls, filter_dict, update_dict):
+        fields = update_dict.get('$set', {})
+        pending = booking_index.find_one(**filter_dict) if booking_index.can_answer(filter_dict) else None
+        if pending and write_queue.merge_pending(pending.get('ticket_id'), fields):
+            # Not flushed yet: the queued snapshot carries the change to Sheet/Mongo
+            cls._update_local(filter_dict, fields)
+            booking_index.update(pending.get('ticket_id'), fields)
+            return type('Result', (), {'modified_count': 1})()
+
+        result = cls._update_one_tiers(filter_dict, update_dict)
+        if getattr(result, 'modified_count', 0) > 0:
+            cls._index_apply(filter_dict, update_dict.get('$set', {}))
+        return result
+
+    @classmethod
+    def _index_apply(cls, filter_dict, fields):
+        """Mirror a successful update into the in-memory index and any unflushed write."""
+        if not booking_index.is_warm() or not booking_index.can_answer(filter_dict):
+            return
+        booking = booking_index.find_one(**filter_dict)
+        if booking:
+            booking_index.update(booking.get('ticket_id'), fields)
+            write_queue.merge_pending(booking.get('ticket_id'), fields)
+
+    @classmethod
+    def _update_one_tiers(cls, filter_dict, update_dict):
         # PRIMARY: Update Google Sheet (persistent, reliable)
         try:
-            from utils.excel_utils import read_bookings_from_google_sheet, upsert_booking_row
-            sheet_bookings = read_bookings_from_google_sheet()
-            found_in_sheet = False
-            for booking in sheet_bookings:
-                if all(str(booking.get(k, '')).strip().upper() == str(v).strip().upper() for k, v in filter_dict.items()):
-                    # Update booking dict
-                    updated_booking = {**booking}
-                    updated_booking.update(update_dict.get('$set', {}))
-                    # Save back to sheet
-                    if upsert_booking_row(updated_booking):
-                        found_in_sheet = True
-                        break
-            if found_in_sheet:
-                return type('Result', (), {'modified_count': 1})()
+            from utils.excel_utils import upsert_booking_row
+            # The index already holds the full row, so no sheet read is needed to rebuild it
+            booking = cls.find_one(**filter_dict)
+            if booking:
+                updated_booking = {**booking}
+                updated_booking.update(update_dict.get('$set', {}))
+                if upsert_booking_row(updated_booking):
+                    return type('Result', (), {'modified_count': 1})()
         except Exception as e:
             print(f"Google Sheet update_one failed: {e}")
         
@@ -388,32 +814,121 @@ class Booking:
         collection = cls.get_collection()
         if collection is not None:
             try:
-                result = collection.update_one(filter_dict, update_dict)
+                with _track_mongo():
+                    result = collection.update_one(filter_dict, update_dict)
                 if result and getattr(result, 'modified_count', 0) > 0:
                     return result
             except Exception as e:
                 print(f"MongoDB update_one failed (non-fatal): {e}")
         
-        # TERTIARY: Update JSON file (local cache)
+        # TERTIARY: local store
+        if cls._update_local(filter_dict, update_dict.get('$set', {})):
+            return type('Result', (), {'modified_count': 1})()
+
+        return type('Result', (), {'modified_count': 0})()
+
+    @classmethod
+    def check_in(cls, ticket_id, gate='', at=None):
+        """
+        Admit a ticket at the gate. The 'Not Used' -> 'Used' flip is a compare-and-set on the
+        in-memory index, so two gates scanning the same ticket can't both admit it.
+        The local store is updated at once; Sheet/Mongo get the change via the write-behind queue.
+        `at` is the scan time for check-ins recorded offline and synced later.
+        Returns (result, booking): result is 'admitted', 'already_used', 'not_paid' or 'not_found'.
+        """
+        booking_index.ensure_loaded()
+        fields = {
+            'entry_status': 'Used',
+            'checked_in_at': at or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'checked_in_gate': gate,
+        }
+        admitted, booking = booking_index.compare_and_set(ticket_id, _admissible, fields)
+        if not admitted:
+            if booking is None:
+                return 'not_found', None
+            if booking.get('payment_status') != 'Paid':
+                return 'not_paid', booking
+            return 'already_used', booking
+
+        cls._update_local({'ticket_id': booking['ticket_id']}, fields)
+        # Field-level: a whole snapshot of the index row would drop Mongo-only fields
+        write_queue.enqueue_update(booking, fields)
+        return 'admitted', booking
+
+    @classmethod
+    def update_many(cls, ticket_ids, fields):
+        """
+        Apply the same $set to many bookings with one write per store (Sheet batch,
+        Mongo bulk_write, one JSON rewrite). Returns {ticket_id: updated booking} for
+        the tickets that exist; unknown ticket IDs are left out.
+        """
+        booking_index.ensure_loaded()
+        updated = {}
+        for ticket_id in ticket_ids:
+            booking = booking_index.find_one(ticket_id=ticket_id)
+            if booking:
+                updated[ticket_id] = {**booking, **fields}
+        if not updated:
+            return {}
+
+        # Bookings still in the write-behind queue just get the change folded in
+        flushed = [b for t, b in updated.items() if not write_queue.merge_pending(t, fields)]
+
+        # PRIMARY: Google Sheet, one batched write (queued for retry if it fails)
+        from utils.excel_utils import sheets_configured
+        if flushed and sheets_configured():
+            sheet_ok = False
+            try:
+                from utils.excel_utils import upsert_booking_rows
+                sheet_ok = upsert_booking_rows(flushed)
+            except Exception as e:
+                print(f"Google Sheet update_many failed: {e}")
+            if not sheet_ok:
+                # Only `fields` go to Mongo on retry: a whole index snapshot would drop Mongo-only fields
+                for booking in flushed:
+                    write_queue.enqueue_update(booking, fields)
+
+        # SECONDARY: MongoDB bulk update (optional)
+        collection = cls.get_collection()
+        if collection is not None and flushed:
+            try:
+                from pymongo import UpdateOne
+                with _track_mongo():
+                    collection.bulk_write([UpdateOne({'ticket_id': b['ticket_id']}, {'$set': fields}) for b in flushed], ordered=False)
+            except Exception as e:
+                print(f"MongoDB update_many failed (non-fatal): {e}")
+
+        # TERTIARY: local store, one write
         try:
-            bookings = cls._load_from_json()
-            found = False
-            for i, booking in enumerate(bookings):
-                if all(str(booking.get(k, '')).strip().upper() == str(v).strip().upper() for k, v in filter_dict.items()):
-                    bookings[i].update(update_dict.get('$set', {}))
-                    found = True
-                    break
-            
-            if found:
-                _atomic_write_json(cls.JSON_FILE, bookings)
-                return type('Result', (), {'modified_count': 1})()
+            cls.local_store().update_many(list(updated), fields)
         except Exception as e:
-            print(f"JSON update_one error: {e}")
-        
-        return type('Result', (), {'modified_count': 0})()
+            print(f"Local store update_many error: {e}")
+
+        for ticket_id in updated:
+            booking_index.update(ticket_id, fields)
+        return updated
+
+    @classmethod
+    def _update_local(cls, filter_dict, fields):
+        try:
+            return cls.local_store().update_one(filter_dict, fields)
+        except Exception as e:
+            print(f"Local store update_one error: {e}")
+        return False
 
     @classmethod
     def delete_one(cls, filter_dict):
+        existing = booking_index.find_one(**filter_dict) if booking_index.can_answer(filter_dict) else None
+        if existing and write_queue.discard(existing.get('ticket_id')):
+            # Never reached Sheet/Mongo; only the local copy needs removing
+            booking_index.remove(existing.get('ticket_id'))
+        result = cls._delete_one_tiers(filter_dict)
+        if getattr(result, 'deleted_count', 0) > 0 and existing:
+            booking_index.remove(existing.get('ticket_id'))
+        return result
+
+    @classmethod
+    def _delete_one_tiers(cls, filter_dict):
         # PRIMARY: Delete from Google Sheet (persistent, reliable)
         try:
             from utils.excel_utils import delete_booking_from_sheet
@@ -428,32 +943,25 @@ class Booking:
         collection = cls.get_collection()
         if collection is not None:
             try:
-                result = collection.delete_one(filter_dict)
+                with _track_mongo():
+                    result = collection.delete_one(filter_dict)
                 if result and getattr(result, 'deleted_count', 0) > 0:
                     return result
             except Exception as e:
                 print(f"MongoDB delete_one failed (non-fatal): {e}")
         
-        # TERTIARY: Delete from JSON file (local cache)
+        # TERTIARY: local store
         try:
-            bookings = cls._load_from_json()
-            for i, booking in enumerate(bookings):
-                if all(str(booking.get(k, '')).strip().upper() == str(v).strip().upper() for k, v in filter_dict.items()):
-                    bookings.pop(i)
-                    _atomic_write_json(cls.JSON_FILE, bookings)
-                    return type('Result', (), {'deleted_count': 1})()
+            if cls.local_store().delete_one(filter_dict):
+                return type('Result', (), {'deleted_count': 1})()
         except Exception as e:
-            print(f"JSON delete_one error: {e}")
+            print(f"Local store delete_one error: {e}")
         
         return type('Result', (), {'deleted_count': 0})()
 
-    @classmethod
-    def _load_from_json(cls):
-        if os.path.exists(cls.JSON_FILE):
-            try:
-                with open(cls.JSON_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data if isinstance(data, list) else []
-            except Exception:
-                return []
-        return []
+
+# Index rebuilds (first lookup + background refresh) read through the normal store tiers
+backend_health.set_probe('mongo', _ping_mongo)
+booking_index.set_loader(Booking._load_all)
+booking_index.set_overlay(write_queue.pending)
+write_queue.set_flush_fn(Booking._persist_remote)
@@ -0,0 +1,398 @@
+"""Process-level in-memory index of bookings keyed by ticket ID (plus email / order ID)."""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+# Secondary keys that can answer Booking.find_one(...) without a store scan
+SECONDARY_FIELDS = ('email', 'order_id')
+INDEXED_FIELDS = ('ticket_id',) + SECONDARY_FIELDS
+# Fields BookingIndex.query() can sort on; numeric ones compare as numbers
+SORT_FIELDS = ('booking_date', 'name', 'email', 'ticket_id', 'payment_status', 'entry_status', 'pass_type',
+               'amount', 'passes')
+NUMERIC_FIELDS = ('amount', 'passes')
+SEARCH_FIELDS = ('name', 'email', 'phone', 'ticket_id')
+
+
+def normalize(value):
+    """Same normalization the store scans use: stripped, case-insensitive."""
+    return str(value if value is not None else '').strip().upper()
+
+
+def _booking_hash(booking):
+    raw = json.dumps({k: v for k, v in booking.items() if k != '_id'}, sort_keys=True, default=str)
+    return int.from_bytes(hashlib.blake2b(raw.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _matches(booking, criteria):
+    return all(normalize(booking.get(k, '')) == normalize(v) for k, v in criteria.items())
+
+
+def _number(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0
+
+
+class BookingStats:
+    """
+    Dashboard aggregates, kept current by adding/subtracting each booking as it changes.
+    - counts by payment_status and entry_status, total passes
+    - paid revenue by pass_type; paid bookings without an amount are kept as pass counts
+      (unpriced_passes) so the caller can price them with the current event pricing
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.passes = 0
+        self.by_payment_status = Counter()
+        self.by_entry_status = Counter()
+        self.revenue_by_pass_type = Counter()
+        self.unpriced_passes = Counter()
+
+    def add(self, booking, sign=1):
+        passes = _number(booking.get('passes', 1))
+        self.count += sign
+        self.passes += sign * passes
+        payment_status = booking.get('payment_status') or 'Pending'
+        self.by_payment_status[payment_status] += sign
+        self.by_entry_status[booking.get('entry_status') or 'Not Used'] += sign
+        if payment_status == 'Paid':
+            pass_type = booking.get('pass_type') or 'entry'
+            amount = booking.get('amount')
+            if amount is not None:
+                self.revenue_by_pass_type[pass_type] += sign * _number(amount)
+            else:
+                self.unpriced_passes[pass_type] += sign * passes
+
+    def remove(self, booking):
+        self.add(booking, -1)
+
+    def snapshot(self):
+        drop_zero = lambda c: {k: v for k, v in c.items() if v}
+        return {
+            'count': self.count,
+            'passes': self.passes,
+            'by_payment_status': drop_zero(self.by_payment_status),
+            'by_entry_status': drop_zero(self.by_entry_status),
+            'revenue_by_pass_type': drop_zero(self.revenue_by_pass_type),
+            'unpriced_passes': drop_zero(self.unpriced_passes),
+        }
+
+
+class BookingIndex:
+    """
+    Bookings held in memory, keyed by normalized ticket_id.
+    - Built once (lazily) from the configured loader, then kept up to date on every
+      save / update / delete made through models.Booking.
+    - A daemon thread reloads it periodically so edits made directly in the Sheet
+      or Mongo show up without a restart.
+    - Dashboard stats (BookingStats) follow every change and are recomputed from the
+      snapshot on each reload, which reconciles any drift.
+    - data_version() is an XOR of per-booking content hashes: it changes with the data only,
+      so it is the same across reloads, restarts and processes holding the same bookings.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._by_ticket = {}
+        self._secondary = {field: {} for field in SECONDARY_FIELDS}
+        self._stats = BookingStats()
+        self._fingerprint = 0
+        self._sorted = {}  # sort spec -> (version, ordered ticket keys)
+        # ticket -> (timestamp, booking or None); local writes a reload must not undo
+        self._local_changes = {}
+        self._loader = None
+        self._overlay = None
+        self._loaded_at = 0
+        self._refresher_pid = None
+        self.version = 0
+
+    def set_loader(self, loader):
+        """loader() -> list[dict]; used for the initial build and background refreshes."""
+        self._loader = loader
+
+    def set_overlay(self, provider):
+        """provider() -> list[dict] of bookings that are newer than any store (e.g. unflushed writes)."""
+        self._overlay = provider
+
+    def is_warm(self):
+        return self._loaded_at > 0
+
+    def ensure_loaded(self):
+        """Build the index on first use. Returns True when lookups can be served from memory."""
+        self._ensure_refresher()
+        if self.is_warm():
+            return True
+        if self._loader is None:
+            return False
+        with self._load_lock:
+            if not self.is_warm():
+                self.refresh()
+        return self.is_warm()
+
+    def refresh(self):
+        """Reload every booking from the loader (network). Safe to call from any thread."""
+        if self._loader is None:
+            return False
+        started = time.time()
+        try:
+            bookings = self._loader()
+        except Exception as e:
+            print(f"Booking index refresh failed: {e}")
+            return False
+        self.rebuild(bookings, started)
+        return True
+
+    def rebuild(self, bookings, started=None):
+        """Replace the index contents with a full snapshot taken at `started`."""
+        started = started if started is not None else time.time()
+        with self._lock:
+            if not bookings and self._by_ticket:
+                # An empty snapshot while we hold data almost always means a failed read
+                print("Booking index refresh returned no bookings; keeping previous index")
+                self._loaded_at = time.time()
+                return
+            by_ticket = {}
+            for booking in bookings or []:
+                key = normalize(booking.get('ticket_id'))
+                if key:
+                    by_ticket[key] = booking
+            # Re-apply local writes the snapshot may predate
+            for key, (ts, booking) in list(self._local_changes.items()):
+                if ts < started:
+                    del self._local_changes[key]
+                    continue
+                if booking is None:
+                    by_ticket.pop(key, None)
+                else:
+                    by_ticket[key] = booking
+            if self._overlay is not None:
+                for booking in self._overlay():
+                    key = normalize(booking.get('ticket_id'))
+                    if key:
+                        by_ticket[key] = {**by_ticket.get(key, {}), **booking}
+            self._by_ticket = by_ticket
+            self._secondary = {field: {} for field in SECONDARY_FIELDS}
+            stats = BookingStats()
+            fingerprint = 0
+            for key, booking in by_ticket.items():
+                self._add_secondary(key, booking)
+                stats.add(booking)
+                fingerprint ^= _booking_hash(booking)
+            self._stats = stats
+            self._fingerprint = fingerprint
+            self._loaded_at = time.time()
+            self.version += 1
+
+    def _add_secondary(self, key, booking):
+        for field in SECONDARY_FIELDS:
+            value = normalize(booking.get(field))
+            if value:
+                self._secondary[field].setdefault(value, set()).add(key)
+
+    def _remove_secondary(self, key, booking):
+        for field in SECONDARY_FIELDS:
+            value = normalize(booking.get(field))
+            keys = self._secondary[field].get(value)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._secondary[field][value]
+
+    def put(self, booking):
+        """Insert or replace a booking."""
+        key = normalize(booking.get('ticket_id'))
+        if not key:
+            return
+        booking = dict(booking)
+        with self._lock:
+            old = self._by_ticket.get(key)
+            if old is not None:
+                self._remove_secondary(key, old)
+                self._stats.remove(old)
+                self._fingerprint ^= _booking_hash(old)
+            self._by_ticket[key] = booking
+            self._add_secondary(key, booking)
+            self._stats.add(booking)
+            self._fingerprint ^= _booking_hash(booking)
+            self._local_changes[key] = (time.time(), booking)
+            self.version += 1
+
+    def update(self, ticket_id, fields):
+        """Apply a $set-style update. Returns the updated booking copy or None if unknown."""
+        key = normalize(ticket_id)
+        with self._lock:
+            old = self._by_ticket.get(key)
+            if old is None:
+                return None
+            updated = {**old, **fields}
+            self._remove_secondary(key, old)
+            self._stats.remove(old)
+            self._by_ticket[key] = updated
+            self._add_secondary(key, updated)
+            self._stats.add(updated)
+            self._fingerprint ^= _booking_hash(old) ^ _booking_hash(updated)
+            self._local_changes[key] = (time.time(), updated)
+            self.version += 1
+            return dict(updated)
+
+    def compare_and_set(self, ticket_id, check, fields):
+        """
+        Apply `fields` only if check(current booking) is true, atomically with respect to
+        other index writers in this process.
+        Returns (True, updated booking copy), or (False, current booking copy or None).
+        """
+        key = normalize(ticket_id)
+        with self._lock:
+            current = self._by_ticket.get(key)
+            if current is None or not check(current):
+                return False, dict(current) if current is not None else None
+            return True, self.update(key, fields)
+
+    def remove(self, ticket_id):
+        key = normalize(ticket_id)
+        with self._lock:
+            old = self._by_ticket.pop(key, None)
+            if old is not None:
+                self._remove_secondary(key, old)
+                self._stats.remove(old)
+                self._fingerprint ^= _booking_hash(old)
+            self._local_changes[key] = (time.time(), None)
+            self.version += 1
+            return old is not None
+
+    def get(self, ticket_id):
+        booking = self._by_ticket.get(normalize(ticket_id))
+        return dict(booking) if booking is not None else None
+
+    def can_answer(self, criteria):
+        return any(field in criteria for field in INDEXED_FIELDS)
+
+    def find_one(self, **criteria):
+        """O(1) lookup on an indexed key, then verify the remaining criteria."""
+        with self._lock:
+            if 'ticket_id' in criteria:
+                booking = self._by_ticket.get(normalize(criteria['ticket_id']))
+                candidates = [booking] if booking is not None else []
+            else:
+                field = next(f for f in SECONDARY_FIELDS if f in criteria)
+                keys = self._secondary[field].get(normalize(criteria[field]), ())
+                candidates = [self._by_ticket[k] for k in keys if k in self._by_ticket]
+            for booking in candidates:
+                if _matches(booking, criteria):
+                    return dict(booking)
+        return None
+
+    def all(self):
+        with self._lock:
+            return [dict(b) for b in self._by_ticket.values()]
+
+    def _ordered_keys(self, sort):
+        """Ticket keys in `sort` order ('' = store order), cached until the index changes."""
+        cached = self._sorted.get(sort)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        field = sort.lstrip('-')
+        if field in NUMERIC_FIELDS:
+            sort_key = lambda k: _number(self._by_ticket[k].get(field))
+        else:
+            sort_key = lambda k: normalize(self._by_ticket[k].get(field))
+        keys = list(self._by_ticket)
+        if field:
+            keys.sort(key=sort_key, reverse=sort.startswith('-'))
+        self._sorted[sort] = (self.version, keys)
+        return keys
+
+    def query(self, filters=None, search='', sort='', offset=0, limit=50, fields=None):
+        """
+        One page of bookings for the admin table.
+        filters: {field: [allowed values]} (normalized match); search: substring of name/email/
+        phone/ticket ID; sort: a SORT_FIELDS name, '-' prefix for descending; fields: projection.
+        Returns (number of matching bookings, page of booking dicts).
+        """
+        if sort.lstrip('-') not in SORT_FIELDS:
+            sort = ''
+        wanted = {f: {normalize(v) for v in values} for f, values in (filters or {}).items() if values}
+        needle = normalize(search) if search else ''
+        with self._lock:
+            keys = self._ordered_keys(sort)
+            if wanted or needle:
+                matched = []
+                for key in keys:
+                    booking = self._by_ticket[key]
+                    if any(normalize(booking.get(f)) not in allowed for f, allowed in wanted.items()):
+                        continue
+                    if needle and not any(needle in normalize(booking.get(f)) for f in SEARCH_FIELDS):
+                        continue
+                    matched.append(key)
+                keys = matched
+            page = [self._by_ticket[k] for k in keys[offset:offset + limit]]
+            if fields:
+                page = [{f: b.get(f) for f in fields} for b in page]
+            else:
+                page = [dict(b) for b in page]
+            return len(keys), page
+
+    def iter_all(self, chunk=500):
+        """
+        Yield booking copies in store order without copying the whole index at once.
+        Bookings removed while iterating are skipped.
+        """
+        with self._lock:
+            keys = list(self._by_ticket)
+        for start in range(0, len(keys), chunk):
+            with self._lock:
+                batch = [self._by_ticket.get(k) for k in keys[start:start + chunk]]
+            for booking in batch:
+                if booking is not None:
+                    yield dict(booking)
+
+    def data_version(self):
+        """Content fingerprint of every booking held (hex); equal data gives an equal version."""
+        return f"{self._fingerprint:016x}"
+
+    def stats(self):
+        """Current BookingStats snapshot (O(number of distinct statuses/pass types))."""
+        with self._lock:
+            return self._stats.snapshot()
+
+    def __len__(self):
+        return len(self._by_ticket)
+
+    def _ensure_refresher(self):
+        # Threads don't survive gunicorn's fork (preload=True), so start one per process
+        pid = os.getpid()
+        if self._refresher_pid == pid or not self.refresh_interval:
+            return
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher_pid = pid
+            t = threading.Thread(target=self._refresh_loop, name='booking-index-refresh', daemon=True)
+            t.start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            if self.is_warm():
+                self.refresh()
+
+
+def _refresh_interval_from_config():
+    try:
+        from config import Config
+        return int(getattr(Config, 'BOOKING_INDEX_REFRESH_SECONDS', 60) or 0)
+    except Exception:
+        return 60
+
+
+booking_index = BookingIndex(refresh_interval=_refresh_interval_from_config())
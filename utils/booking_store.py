@@ -0,0 +1,168 @@
+"""SQLite booking store (DATA_DIR/bookings.db, WAL): the local tier behind Sheet and Mongo."""
+import json
+import os
+import sqlite3
+import threading
+
+from utils.booking_index import normalize
+
+# Columns kept next to the JSON document so lookups use an index instead of a scan
+KEY_COLUMNS = ('ticket_id', 'email', 'order_id', 'payment_status')
+
+
+class SqliteBookingStore:
+    """
+    One row per booking keyed by normalized ticket ID; the full booking is stored as JSON.
+    - WAL mode: readers never block the writer, and several gunicorn workers can share the file.
+    - Matching follows the JSON tier: values compared stripped and case-insensitive.
+    - Updates and deletes touch a single row instead of rewriting every booking.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bookings ("
+            " ticket_id TEXT PRIMARY KEY, email TEXT, order_id TEXT, payment_status TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_email ON bookings(email)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_order ON bookings(order_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_payment ON bookings(payment_status)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _conn(self):
+        # One connection per thread and process (sqlite connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _params(booking):
+        doc = {k: v for k, v in booking.items() if k != '_id'}
+        return tuple(normalize(doc.get(c)) for c in KEY_COLUMNS) + (json.dumps(doc, default=str),)
+
+    def _upsert(self, conn, bookings):
+        # Upsert rather than REPLACE so a booking keeps its rowid (list order) when rewritten
+        conn.executemany(
+            "INSERT INTO bookings (ticket_id, email, order_id, payment_status, data) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(ticket_id) DO UPDATE SET email = excluded.email, order_id = excluded.order_id,"
+            " payment_status = excluded.payment_status, data = excluded.data",
+            [self._params(b) for b in bookings if normalize(b.get('ticket_id'))],
+        )
+
+    def _select(self, conn, criteria):
+        """Rows (rowid, data) matching criteria, narrowed by the best indexed column available."""
+        column = next((c for c in KEY_COLUMNS if c in criteria), None)
+        if column:
+            rows = conn.execute(f"SELECT rowid, data FROM bookings WHERE {column} = ? ORDER BY rowid",
+                                (normalize(criteria[column]),))
+        else:
+            rows = conn.execute("SELECT rowid, data FROM bookings ORDER BY rowid")
+        for rowid, data in rows:
+            booking = json.loads(data)
+            if all(normalize(booking.get(k, '')) == normalize(v) for k, v in criteria.items()):
+                yield rowid, booking
+
+    def insert(self, booking):
+        self._upsert(self._conn(), [booking])
+
+    def find_one(self, **criteria):
+        for _, booking in self._select(self._conn(), criteria):
+            return booking
+        return None
+
+    def all(self):
+        return [json.loads(data) for (data,) in self._conn().execute("SELECT data FROM bookings ORDER BY rowid")]
+
+    def update_one(self, filter_dict, fields):
+        """Merge `fields` into the first booking matching filter_dict. Returns True if one was updated."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            match = next(self._select(conn, filter_dict), None)
+            if match is None:
+                conn.execute("COMMIT")
+                return False
+            rowid, booking = match
+            booking.update(fields)
+            conn.execute(
+                "UPDATE bookings SET ticket_id = ?, email = ?, order_id = ?, payment_status = ?, data = ?"
+                " WHERE rowid = ?",
+                self._params(booking) + (rowid,),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update_many(self, ticket_ids, fields):
+        """Merge `fields` into each listed booking in one transaction. Returns the number updated."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            updated = []
+            for ticket_id in ticket_ids:
+                row = conn.execute("SELECT data FROM bookings WHERE ticket_id = ?", (normalize(ticket_id),)).fetchone()
+                if row:
+                    updated.append({**json.loads(row[0]), **fields})
+            self._upsert(conn, updated)
+            conn.execute("COMMIT")
+            return len(updated)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_one(self, filter_dict):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            match = next(self._select(conn, filter_dict), None)
+            if match is not None:
+                conn.execute("DELETE FROM bookings WHERE rowid = ?", (match[0],))
+            conn.execute("COMMIT")
+            return match is not None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def migrate_from_json(self, json_path):
+        """Import bookings.json once (recorded in the meta table). Returns the number imported."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return 0
+        bookings = []
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                bookings = data if isinstance(data, list) else []
+            except Exception as e:
+                print(f"bookings.json migration skipped, file unreadable: {e}")
+                return 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Rows already in the database win over the older JSON copy
+            conn.executemany(
+                "INSERT OR IGNORE INTO bookings (ticket_id, email, order_id, payment_status, data)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [self._params(b) for b in bookings if isinstance(b, dict) and normalize(b.get('ticket_id'))],
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (json_path,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if bookings:
+            print(f"Migrated {len(bookings)} booking(s) from {json_path} to {self.path}")
+        return len(bookings)
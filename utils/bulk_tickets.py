@@ -0,0 +1,194 @@
+"""
+Bulk pre-generation of every paid ticket (backup / printing) into a downloadable ZIP.
+
+Tickets are rendered across a process pool into DATA_DIR/ticket_bundle/parts, one file per
+ticket named by its ticket cache key, so an interrupted run resumes where it stopped and
+unchanged tickets are never rendered twice. The ZIP is streamed from those files on download.
+
+    python -m utils.bulk_tickets holi_tickets.zip
+"""
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import Config
+
+# Bookings handed to a worker process per task (amortizes pickling / IPC)
+CHUNK_SIZE = 25
+
+# Default pool size cap when TICKET_BUNDLE_WORKERS is not set
+DEFAULT_MAX_WORKERS = 2
+
+
+def bundle_dir():
+    base = (getattr(Config, 'DATA_DIR', '') or '').strip() or tempfile.gettempdir()
+    return os.path.join(base, 'ticket_bundle')
+
+
+def _parts_dir():
+    return os.path.join(bundle_dir(), 'parts')
+
+
+def _manifest_path():
+    return os.path.join(bundle_dir(), 'manifest.json')
+
+
+def _part_name(booking):
+    from utils.ticket_utils import ticket_cache_key
+    return f"{booking['ticket_id']}-{ticket_cache_key(booking)[:16]}.pdf"
+
+
+def _default_workers():
+    # os.cpu_count() is the host's core count in a container; the affinity mask is what we may use
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, DEFAULT_MAX_WORKERS))
+
+
+def _render_chunk(parts_dir, bookings):
+    """Worker process: render each booking to parts_dir/<part name> atomically. Returns the count."""
+    from utils.ticket_utils import _render_ticket_pdf
+    for booking in bookings:
+        data = _render_ticket_pdf(booking)
+        fd, tmp_path = tempfile.mkstemp(prefix='tmp_', suffix='.pdf', dir=parts_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(parts_dir, booking['_part']))
+    return len(bookings)
+
+
+def paid_bookings():
+    """Paid bookings with the event venue/date/pricing the ticket prints, streamed from the index."""
+    from models import Booking, EventContent
+    content = EventContent.get_content()
+    for booking in Booking.iter_all():
+        if booking.get('payment_status') == 'Paid' and booking.get('ticket_id'):
+            yield {
+                **{k: v for k, v in booking.items() if k != '_id'},
+                'venue': content.get('venue', 'Kunjachaya, Bhadreswar'),
+                'event_date': content.get('event_date', 'March 3, 2026'),
+                'pricing': content.get('pricing', {}),
+            }
+
+
+def build_bundle(bookings, workers=None, progress=None):
+    """
+    Render every booking whose part file is missing, then record the bundle manifest.
+    progress(done, total, rate) is called as chunks finish. Returns a summary dict.
+    """
+    parts_dir = _parts_dir()
+    os.makedirs(parts_dir, exist_ok=True)
+    existing = set(os.listdir(parts_dir))
+    names, todo = [], []
+    for booking in bookings:
+        booking['_part'] = _part_name(booking)
+        names.append((booking['ticket_id'], booking['_part']))
+        if booking['_part'] not in existing:
+            todo.append(booking)
+
+    total = len(todo)
+    workers = max(1, int(workers or getattr(Config, 'TICKET_BUNDLE_WORKERS', 0) or _default_workers()))
+    started = time.time()
+    done = 0
+    if 0 < total <= CHUNK_SIZE:
+        # A handful of changed tickets: not worth starting worker processes
+        done = _render_chunk(parts_dir, todo)
+    elif todo:
+        # spawn, not fork: the web process has live threads (flushers, job pool) a fork would copy mid-lock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_render_chunk, parts_dir, todo[i:i + CHUNK_SIZE])
+                       for i in range(0, total, CHUNK_SIZE)]
+            for future in as_completed(futures):
+                done += future.result()
+                if progress:
+                    elapsed = time.time() - started
+                    progress(done, total, done / elapsed if elapsed else 0.0)
+    elapsed = time.time() - started
+
+    manifest = {'created_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'parts': names}
+    fd, tmp_path = tempfile.mkstemp(prefix='tmp_', suffix='.json', dir=bundle_dir())
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _manifest_path())
+    _prune_parts(parts_dir, {name for _, name in names})
+    return {
+        'tickets': len(names),
+        'rendered': done,
+        'reused': len(names) - done,
+        'workers': workers,
+        'seconds': round(elapsed, 1),
+        'tickets_per_sec': round(done / elapsed, 1) if done and elapsed else None,
+    }
+
+
+def _prune_parts(parts_dir, keep):
+    # Parts of tickets that changed or are no longer paid
+    for name in os.listdir(parts_dir):
+        if name not in keep and not name.startswith('tmp_'):
+            try:
+                os.unlink(os.path.join(parts_dir, name))
+            except OSError:
+                pass
+
+
+def bundle_ready():
+    return os.path.exists(_manifest_path())
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into; the generator drains it."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_bundle_zip():
+    """Yield the ZIP of the last built bundle in chunks (PDFs are already compressed: stored)."""
+    with open(_manifest_path(), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    parts_dir = _parts_dir()
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zf:
+        for ticket_id, name in manifest['parts']:
+            path = os.path.join(parts_dir, name)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as src, zf.open(f"ticket_{ticket_id}.pdf", 'w') as dst:
+                shutil.copyfileobj(src, dst, 64 * 1024)
+            yield sink.take()
+    yield sink.take()
+
+
+if __name__ == '__main__':
+    out_path = sys.argv[1] if len(sys.argv) > 1 else 'holi_tickets.zip'
+
+    def report(done, total, rate):
+        print(f"  {done}/{total} rendered, {rate:.1f} tickets/sec", flush=True)
+
+    summary = build_bundle(list(paid_bookings()), progress=report)
+    print(f"Bundle: {summary}")
+    with open(out_path, 'wb') as out:
+        for chunk in iter_bundle_zip():
+            out.write(chunk)
+    print(f"Wrote {out_path}")
@@ -1,11 +1,20 @@
 import base64
+import hashlib
+import json
+import os
 import smtplib
+import threading
+import time
+from collections import OrderedDict
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from io import BytesIO
 from config import Config
+from utils.health import backend_health
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import Markup
 
 try:
     import resend
@@ -26,324 +35,298 @@ except ImportError:
     requests = None
 
 
+EMAIL_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'email')
+
+PASS_TYPE_LABELS = {
+    'entry': 'Entry Only',
+    'entry_starter': 'Entry + Starter',
+    'entry_starter_lunch': 'Entry + Starter + Lunch'
+}
+
+# Compiled once per process; templates don't change at runtime
+_jinja_env = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=False,
+)
+_booking_template = _jinja_env.get_template('booking_confirmed.html')
+
+_fragments = OrderedDict()
+_fragments_lock = threading.Lock()
+_last_fragments = None  # (event_content dict, fragments) of the most recent call
+MAX_FRAGMENT_VERSIONS = 4
+
+
+def _event_context(event_content):
+    """The event-level values the email uses, with the same defaults as before."""
+    pricing = event_content.get('pricing', {}) or {}
+    return {
+        'event_date': event_content.get('event_date', 'March 3, 2026'),
+        'event_time': event_content.get('event_time', '10:00 AM – 5:00 PM'),
+        'venue': event_content.get('venue', 'Kunjachaya, Bhadreswar'),
+        'organizer': event_content.get('organizer', 'Spectra Group'),
+        'complimentary': event_content.get('complimentary', 'Abir & Special Lassi'),
+        'food_available': pricing.get('food_available', 'Food & drink available at counter'),
+        'contact_persons': event_content.get('contact_persons', []) or [],
+        'prices': {
+            'entry': pricing.get('entry_pass', 200),
+            'entry_starter': pricing.get('entry_plus_starter', 350),
+            'entry_starter_lunch': pricing.get('entry_plus_starter_lunch', 500),
+        },
+    }
+
+
+def _event_fragments(event_content):
+    """
+    Pre-rendered event parts of the email (CSS, event info, contacts, footer), cached by a
+    fingerprint of the event content so each edit produces a fresh set.
+    """
+    global _last_fragments
+    last = _last_fragments
+    if last is not None and last[0] is event_content:
+        # EventContent.get_content() hands out the same dict until it reloads
+        return last[1]
+    ctx = _event_context(event_content)
+    key = hashlib.sha256(json.dumps(ctx, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    with _fragments_lock:
+        fragments = _fragments.get(key)
+        if fragments is not None:
+            _fragments.move_to_end(key)
+    if fragments is None:
+        module = _jinja_env.get_template('_event_fragments.html').make_module({'event': ctx})
+        fragments = {name: Markup(getattr(module, name)())
+                     for name in ('head', 'event_info', 'complimentary', 'food_options', 'contact', 'footer')}
+        fragments['prices'] = ctx['prices']
+        with _fragments_lock:
+            _fragments[key] = fragments
+            while len(_fragments) > MAX_FRAGMENT_VERSIONS:
+                _fragments.popitem(last=False)
+    _last_fragments = (event_content, fragments)
+    return fragments
+
+
 def create_success_email_template(booking, event_content):
     """Create a comprehensive success email template with all booking and plan details."""
-    # Get pass type label
-    pass_type_labels = {
-        'entry': 'Entry Only',
-        'entry_starter': 'Entry + Starter',
-        'entry_starter_lunch': 'Entry + Starter + Lunch'
-    }
-    pass_label = pass_type_labels.get(booking.get('pass_type', 'entry'), 'Entry Only')
-    
-    # Get pricing details
-    pricing = event_content.get('pricing', {})
-    entry_pass_price = pricing.get('entry_pass', 200)
-    entry_starter_price = pricing.get('entry_plus_starter', 350)
-    entry_lunch_price = pricing.get('entry_plus_starter_lunch', 500)
-    
-    # Calculate plan details
+    event = _event_fragments(event_content)
     passes = booking.get('passes', 1)
     pass_type = booking.get('pass_type', 'entry')
-    
-    # Determine fallback price based on pass type
-    fallback_price_per_pass = entry_pass_price
-    if pass_type == 'entry_starter':
-        fallback_price_per_pass = entry_starter_price
-    elif pass_type == 'entry_starter_lunch':
-        fallback_price_per_pass = entry_lunch_price
-        
-    amount = booking.get('amount', passes * fallback_price_per_pass)
-    
-    # Get event details
-    event_date = event_content.get('event_date', 'March 3, 2026')
-    event_time = event_content.get('event_time', '10:00 AM – 5:00 PM')
-    venue = event_content.get('venue', 'Kunjachaya, Bhadreswar')
-    organizer = event_content.get('organizer', 'Spectra Group')
-    complimentary = event_content.get('complimentary', 'Abir & Special Lassi')
-    food_available = pricing.get('food_available', 'Food & drink available at counter')
-    
-    # Get contact persons
-    contact_persons = event_content.get('contact_persons', [])
-    contact_info = ""
-    if contact_persons:
-        contact_info = "<ul>"
-        for person in contact_persons:
-            contact_info += f"<li><strong>{person.get('name', '')}</strong>: {person.get('phone', '')}</li>"
-        contact_info += "</ul>"
-    
-    # Booking date
-    booking_date = booking.get('booking_date', '')
-    
-    # Create comprehensive email HTML
-    html_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            body {{
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-                background-color: #f4f4f4;
-            }}
-            .container {{
-                background-color: #ffffff;
-                border-radius: 10px;
-                padding: 30px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            .header {{
-                text-align: center;
-                background: linear-gradient(135deg, #ff2f92 0%, #ff6b35 100%);
-                color: white;
-                padding: 25px;
-                border-radius: 10px 10px 0 0;
-                margin: -30px -30px 30px -30px;
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 28px;
-                font-weight: bold;
-            }}
-            .success-badge {{
-                background-color: #4CAF50;
-                color: white;
-                padding: 10px 20px;
-                border-radius: 25px;
-                display: inline-block;
-                margin: 15px 0;
-                font-weight: bold;
-            }}
-            .ticket-info {{
-                background-color: #f8f9fa;
-                border-left: 4px solid #ff2f92;
-                padding: 20px;
-                margin: 20px 0;
-                border-radius: 5px;
-            }}
-            .ticket-info h2 {{
-                color: #ff2f92;
-                margin-top: 0;
-                font-size: 20px;
-            }}
-            .info-row {{
-                display: flex;
-                justify-content: space-between;
-                padding: 10px 0;
-                border-bottom: 1px solid #e0e0e0;
-            }}
-            .info-row:last-child {{
-                border-bottom: none;
-            }}
-            .info-label {{
-                font-weight: bold;
-                color: #555;
-                flex: 1;
-            }}
-            .info-value {{
-                color: #333;
-                flex: 1;
-                text-align: right;
-            }}
-            .highlight {{
-                background-color: #fff3cd;
-                padding: 15px;
-                border-radius: 5px;
-                margin: 20px 0;
-                border-left: 4px solid #ffc107;
-            }}
-            .plan-details {{
-                background-color: #e8f5e9;
-                padding: 20px;
-                border-radius: 5px;
-                margin: 20px 0;
-            }}
-            .plan-details h3 {{
-                color: #2e7d32;
-                margin-top: 0;
-            }}
-            .amount-box {{
-                background-color: #ff2f92;
-                color: white;
-                padding: 20px;
-                border-radius: 5px;
-                text-align: center;
-                margin: 20px 0;
-                font-size: 24px;
-                font-weight: bold;
-            }}
-            .footer {{
-                margin-top: 30px;
-                padding-top: 20px;
-                border-top: 2px solid #e0e0e0;
-                text-align: center;
-                color: #666;
-                font-size: 14px;
-            }}
-            .contact-box {{
-                background-color: #e3f2fd;
-                padding: 15px;
-                border-radius: 5px;
-                margin: 20px 0;
-            }}
-            .contact-box h3 {{
-                color: #1976d2;
-                margin-top: 0;
-            }}
-            ul {{
-                margin: 10px 0;
-                padding-left: 20px;
-            }}
-            li {{
-                margin: 5px 0;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🎉 Spectra HoliParty 2026 🎉</h1>
-            </div>
-            
-            <div style="text-align: center;">
-                <div class="success-badge">✓ Booking Confirmed!</div>
-            </div>
-            
-            <p>Dear <strong>{booking.get('name', 'Guest')}</strong>,</p>
-            
-            <p>We are thrilled to confirm your booking for <strong>Spectra HoliParty 2026</strong>! Your entry pass has been successfully processed and confirmed.</p>
-            
-            <div class="ticket-info">
-                <h2>🎫 Your Ticket Details</h2>
-                <div class="info-row">
-                    <span class="info-label">Ticket ID:</span>
-                    <span class="info-value"><strong>{booking.get('ticket_id', 'N/A')}</strong></span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Order ID:</span>
-                    <span class="info-value">{booking.get('order_id', booking.get('ticket_id', 'N/A'))}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Booking Date:</span>
-                    <span class="info-value">{booking_date}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Payment Status:</span>
-                    <span class="info-value" style="color: #4CAF50;"><strong>✓ Paid</strong></span>
-                </div>
-            </div>
-            
-            <div class="plan-details">
-                <h3>📋 Your Booking Plan</h3>
-                <div class="info-row">
-                    <span class="info-label">Pass Type:</span>
-                    <span class="info-value"><strong>{pass_label}</strong></span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Number of Passes:</span>
-                    <span class="info-value"><strong>{passes} {'Pass' if passes == 1 else 'Passes'}</strong></span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Booking Type:</span>
-                    <span class="info-value">{'Group Booking (5+ passes)' if booking.get('is_group_booking', False) else 'Individual Booking'}</span>
-                </div>
-            </div>
-            
-            <div class="amount-box">
-                {f"<div style='font-size: 16px; margin-bottom: 5px; opacity: 0.9;'>{booking.get('discount_description')} Applied!</div>" if booking.get('discount_description') else ""}
-                Total Amount Paid: ₹{amount}
-            </div>
-            
-            <div class="highlight">
-                <h3 style="margin-top: 0; color: #856404;">📅 Event Information</h3>
-                <div class="info-row">
-                    <span class="info-label">Date:</span>
-                    <span class="info-value"><strong>{event_date}</strong></span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Time:</span>
-                    <span class="info-value"><strong>{event_time}</strong></span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Venue:</span>
-                    <span class="info-value"><strong>{venue}</strong></span>
-                </div>
-            </div>
-            
-            <div class="plan-details">
-                <h3>🎁 What's Included</h3>
-                <ul>
-                    <li><strong>Entry Pass:</strong> Access to the event venue</li>
-                    {f"<li><strong>Starter:</strong> Delicious starter included</li>" if pass_type in ['entry_starter', 'entry_starter_lunch'] else ""}
-                    {f"<li><strong>Lunch:</strong> Full meal included</li>" if pass_type == 'entry_starter_lunch' else ""}
-                    <li><strong>Complimentary:</strong> {complimentary}</li>
-                </ul>
-                <p><strong>Food Options:</strong> {food_available}</p>
-            </div>
-            
-            <div class="highlight">
-                <h3 style="margin-top: 0; color: #856404;">📱 Important Instructions</h3>
-                <ul>
-                    <li>Your ticket PDF is attached to this email. Please download and save it.</li>
-                    <li>Show the QR code on your ticket at the gate for entry.</li>
-                    <li>Please arrive on time to avoid any delays.</li>
-                    <li>Carry a valid ID proof along with your ticket.</li>
-                    <li>Keep your ticket safe - you'll need it for entry.</li>
-                </ul>
-            </div>
-            
-            <div class="contact-box">
-                <h3>📞 Need Help?</h3>
-                <p>If you have any questions or need assistance, feel free to contact us:</p>
-                {contact_info if contact_info else "<p><strong>Contact:</strong> Check our website for contact details</p>"}
-            </div>
-            
-            <div class="ticket-info">
-                <h2>👤 Your Contact Information</h2>
-                <div class="info-row">
-                    <span class="info-label">Name:</span>
-                    <span class="info-value">{booking.get('name', 'N/A')}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Email:</span>
-                    <span class="info-value">{booking.get('email', 'N/A')}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Phone:</span>
-                    <span class="info-value">{booking.get('phone', 'N/A')}</span>
-                </div>
-                <div class="info-row">
-                    <span class="info-label">Address:</span>
-                    <span class="info-value">{booking.get('address', 'N/A')}</span>
-                </div>
-            </div>
-            
-            <p style="margin-top: 30px;">We look forward to celebrating Holi with you! Get ready for an amazing day filled with colors, music, and joy! 🎨🎵🎉</p>
-            
-            <div class="footer">
-                <p><strong>Organized by {organizer}</strong></p>
-                <p>Thank you for choosing Spectra HoliParty 2026!</p>
-                <p style="font-size: 12px; color: #999;">This is an automated confirmation email. Please do not reply to this email.</p>
-            </div>
-        </div>
-    </body>
-    </html>
+    # Fallback price based on pass type when the booking has no amount
+    fallback_price_per_pass = event['prices'].get(pass_type, event['prices']['entry'])
+    return _booking_template.render(
+        event=event,
+        greeting_name=booking.get('name', 'Guest'),
+        name=booking.get('name', 'N/A'),
+        ticket_id=booking.get('ticket_id', 'N/A'),
+        order_id=booking.get('order_id', booking.get('ticket_id', 'N/A')),
+        booking_date=booking.get('booking_date', ''),
+        pass_label=PASS_TYPE_LABELS.get(pass_type, 'Entry Only'),
+        passes_text=f"{passes} {'Pass' if passes == 1 else 'Passes'}",
+        booking_type='Group Booking (5+ passes)' if booking.get('is_group_booking', False) else 'Individual Booking',
+        discount_description=booking.get('discount_description'),
+        amount=booking.get('amount', passes * fallback_price_per_pass),
+        includes_starter=pass_type in ('entry_starter', 'entry_starter_lunch'),
+        includes_lunch=pass_type == 'entry_starter_lunch',
+        email=booking.get('email', 'N/A'),
+        phone=booking.get('phone', 'N/A'),
+        address=booking.get('address', 'N/A'),
+    )
+
+
+# ---- transports ------------------------------------------------------------------------------
+# Connections are reused across sends. They are per process: sockets inherited over gunicorn's
+# fork would be shared with the parent, so each process opens its own.
+
+EMAIL_HTTP_TIMEOUT = 30
+
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+
+if requests is not None:
+    class _TrackedSession(requests.Session):
+        """Session whose transport errors and 5xx replies count against the 'email' circuit."""
+
+        def request(self, *args, **kwargs):
+            try:
+                response = super().request(*args, **kwargs)
+            except requests.RequestException as e:
+                backend_health.failure('email', e)
+                raise
+            if response.status_code >= 500:
+                backend_health.failure('email', f"HTTP {response.status_code} from {response.url}")
+            else:
+                backend_health.success('email')
+            return response
+
+
+def _get_http_session():
+    """Keep-alive requests.Session shared by the HTTP providers (Resend, SendGrid, Mailgun)."""
+    global _http_session, _http_session_pid
+    pid = os.getpid()
+    if _http_session is not None and _http_session_pid == pid:
+        return _http_session
+    with _http_session_lock:
+        if _http_session is None or _http_session_pid != pid:
+            session = _TrackedSession()
+            pool_size = max(4, int(getattr(Config, 'JOB_WORKERS', 2) or 2))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session, _http_session_pid = session, pid
+    return _http_session
+
+
+if resend is not None:
+    try:
+        from resend.http_client import HTTPClient as _ResendHTTPClient
+    except ImportError:  # older SDKs always use requests.post
+        _ResendHTTPClient = object
+
+    class _ResendSessionClient(_ResendHTTPClient):
+        """Resend SDK HTTP client that goes through the shared keep-alive session."""
+
+        def request(self, method, url, headers, json=None, files=None, data=None):
+            try:
+                resp = _get_http_session().request(
+                    method=method, url=url, headers=headers,
+                    json=json if data is None and files is None else None,
+                    files=files, data=data, timeout=EMAIL_HTTP_TIMEOUT,
+                )
+                return resp.content, resp.status_code, resp.headers
+            except requests.RequestException as e:
+                # The SDK turns this into a ResendError
+                raise RuntimeError(f"Request failed: {e}") from e
+
+    _resend_client = _ResendSessionClient()
+
+
+def _configure_resend(api_key):
+    # Module-level SDK settings: only touch them when they actually change
+    api_url = getattr(Config, 'RESEND_API_URL', None) or 'https://api.resend.com'
+    if resend.api_key != api_key:
+        resend.api_key = api_key
+    if getattr(resend, 'api_url', api_url) != api_url:
+        resend.api_url = api_url
+    if hasattr(resend, 'default_http_client') and resend.default_http_client is not _resend_client:
+        resend.default_http_client = _resend_client
+
+
+class SmtpPool:
     """
-    return html_body
+    Authenticated SMTP connections reused across sends.
+    - A connection idle longer than `idle_timeout` is closed rather than reused.
+    - A send that fails because the server hung up is retried once on a fresh connection.
+    """
+
+    def __init__(self, max_idle=2, idle_timeout=60):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = []  # [(smtplib.SMTP, last_used)]
+        self._pid = os.getpid()
+        self.connects = 0
+
+    def _connect(self):
+        host = getattr(Config, 'SMTP_HOST', None) or 'smtp.gmail.com'
+        port = int(getattr(Config, 'SMTP_PORT', None) or 587)
+        server = smtplib.SMTP(host, port, timeout=EMAIL_HTTP_TIMEOUT)
+        try:
+            if getattr(Config, 'SMTP_STARTTLS', True):
+                server.starttls()
+            server.login(getattr(Config, 'EMAIL_USER', ''), getattr(Config, 'EMAIL_PASS', ''))
+        except Exception:
+            _close_smtp(server)
+            raise
+        self.connects += 1
+        return server
+
+    def _acquire(self):
+        now = time.time()
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited over fork; the sockets belong to the parent
+                self._idle, self._pid = [], os.getpid()
+            while self._idle:
+                server, last_used = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return server
+                _close_smtp(server)
+        return self._connect()
+
+    def _release(self, server):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((server, time.time()))
+                return
+        _close_smtp(server)
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        with backend_health.track('email', ignore=SMTP_MESSAGE_ERRORS):
+            self._sendmail(from_addr, to_addrs, msg)
+
+    def _sendmail(self, from_addr, to_addrs, msg):
+        server = self._acquire()
+        try:
+            server.sendmail(from_addr, to_addrs, msg)
+        except Exception as e:
+            _close_smtp(server)
+            if not _smtp_connection_lost(e):
+                raise
+            # Stale connection (server timed it out); one retry on a new one
+            server = self._connect()
+            try:
+                server.sendmail(from_addr, to_addrs, msg)
+            except Exception:
+                _close_smtp(server)
+                raise
+        self._release(server)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            _close_smtp(server)
+
+
+# Rejections of this particular message; the server itself is fine
+SMTP_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def _smtp_connection_lost(error):
+    if isinstance(error, (smtplib.SMTPServerDisconnected, ConnectionError)):
+        return True
+    # 421: service closing transmission channel
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
+
+
+def _close_smtp(server):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+smtp_pool = SmtpPool(
+    max_idle=max(1, int(getattr(Config, 'JOB_WORKERS', 2) or 2)),
+    idle_timeout=float(getattr(Config, 'SMTP_IDLE_TIMEOUT', 60) or 60),
+)
+
+
+def close_email_transports():
+    """QUIT pooled SMTP connections and close HTTP keep-alive sockets (gunicorn worker_exit)."""
+    smtp_pool.close()
+    if _http_session is not None and _http_session_pid == os.getpid():
+        _http_session.close()
 
 
 def _send_via_smtp(to, subject, body, attachment=None, from_email=None):
     """Send email via SMTP (Gmail, etc.)"""
     email_user = getattr(Config, 'EMAIL_USER', None) or ''
     email_pass = getattr(Config, 'EMAIL_PASS', None) or ''
-    smtp_host = getattr(Config, 'SMTP_HOST', None) or 'smtp.gmail.com'
-    smtp_port = int(getattr(Config, 'SMTP_PORT', None) or 587)
     
     if not from_email:
         from_email = email_user
@@ -373,12 +356,7 @@ def _send_via_smtp(to, subject, body, attachment=None, from_email=None):
             except Exception as e:
                 print(f"Attachment processing error: {e}")
         
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
-        server.login(email_user, email_pass)
-        text = msg.as_string()
-        server.sendmail(from_email, to, text)
-        server.quit()
+        smtp_pool.sendmail(from_email, to, msg.as_string())
         
         print(f"✓ Email sent successfully via SMTP to {to}")
         return True
@@ -391,8 +369,8 @@ def _send_via_smtp(to, subject, body, attachment=None, from_email=None):
 
 def _send_via_sendgrid(to, subject, body, attachment=None, from_email=None):
     """Send email via SendGrid API"""
-    if sendgrid is None:
-        print("ERROR: sendgrid package not installed. Run: pip install sendgrid")
+    if sendgrid is None or requests is None:
+        print("ERROR: sendgrid/requests package not installed. Run: pip install sendgrid requests")
         return False
     
     api_key = getattr(Config, 'SENDGRID_API_KEY', None) or ''
@@ -404,7 +382,6 @@ def _send_via_sendgrid(to, subject, body, attachment=None, from_email=None):
         return False
     
     try:
-        sg = sendgrid.SendGridAPIClient(api_key=api_key)
         message = Mail(
             from_email=from_email,
             to_emails=to,
@@ -428,7 +405,17 @@ def _send_via_sendgrid(to, subject, body, attachment=None, from_email=None):
             except Exception as e:
                 print(f"Attachment processing error: {e}")
         
-        response = sg.send(message)
+        # SDK builds the payload; the pooled session sends it (the SDK client opens a new connection per call)
+        api_url = getattr(Config, 'SENDGRID_API_URL', None) or 'https://api.sendgrid.com'
+        response = _get_http_session().post(
+            f"{api_url}/v3/mail/send",
+            json=message.get(),
+            headers={'Authorization': f'Bearer {api_key}'},
+            timeout=EMAIL_HTTP_TIMEOUT,
+        )
+        if response.status_code >= 300:
+            print(f"SendGrid email send failed: {response.status_code} - {response.text}")
+            return False
         print(f"✓ Email sent successfully via SendGrid to {to} (Status: {response.status_code})")
         return True
     except Exception as e:
@@ -454,7 +441,8 @@ def _send_via_mailgun(to, subject, body, attachment=None, from_email=None):
         return False
     
     try:
-        url = f"https://api.mailgun.net/v3/{domain}/messages"
+        api_url = getattr(Config, 'MAILGUN_API_URL', None) or 'https://api.mailgun.net'
+        url = f"{api_url}/v3/{domain}/messages"
         files = []
         
         if attachment:
@@ -474,7 +462,8 @@ def _send_via_mailgun(to, subject, body, attachment=None, from_email=None):
             'html': body
         }
         
-        response = requests.post(url, auth=('api', api_key), data=data, files=files)
+        response = _get_http_session().post(url, auth=('api', api_key), data=data, files=files,
+                                            timeout=EMAIL_HTTP_TIMEOUT)
         
         if response.status_code == 200:
             print(f"✓ Email sent successfully via Mailgun to {to}")
@@ -511,7 +500,7 @@ def _send_via_resend(to, subject, body, attachment=None, from_email=None):
         return False
     
     try:
-        resend.api_key = api_key
+        _configure_resend(api_key)
         
         attachments = []
         if attachment:
@@ -543,8 +532,10 @@ def _send_via_resend(to, subject, body, attachment=None, from_email=None):
         
         response = resend.Emails.send(params)
         
-        if response and hasattr(response, 'id'):
-            print(f"✓ Email sent successfully via Resend to {to} (Resend ID: {response.id})")
+        # SDK 2.x returns a dict, older versions an object
+        resend_id = response.get('id') if isinstance(response, dict) else getattr(response, 'id', None)
+        if resend_id:
+            print(f"✓ Email sent successfully via Resend to {to} (Resend ID: {resend_id})")
             return True
         else:
             print(f"Email send failed: Unexpected response from Resend: {response}")
@@ -602,6 +593,10 @@ def send_email(to, subject, body, attachment=None):
         return False
     
     to = str(to).strip()
+
+    if not backend_health.allow('email'):
+        print(f"Email provider unavailable (circuit open), not sending to {to}")
+        return False
     
     # Determine which provider to use (default: resend for backward compatibility)
     provider = (getattr(Config, 'EMAIL_PROVIDER', None) or 'resend').lower().strip()
@@ -1,11 +1,25 @@
 import gspread
 import json
 import os
+import re
+import threading
 from config import Config
+from utils.health import backend_health
 
 _sheet_client = None
 _sheet_client_error = None
 
+# Cached worksheet handle plus per-handle state:
+# - _row_map: normalized Ticket ID -> sheet row number (row 1 is the header)
+# - _next_row: first row after the data, where append_row lands
+# - _schema_checked: header row verified/created for this handle
+_worksheet = None
+_row_map = None
+_next_row = None
+_schema_checked = False
+_sheet_lock = threading.RLock()
+_credentials_found = None
+
 def _get_credentials():
     """Load Google credentials from GOOGLE_CREDS_JSON env var or from file."""
     # 1. Try GOOGLE_CREDS_JSON env var (for Render/Heroku where file path can be tricky)
@@ -35,10 +49,28 @@ def _get_credentials():
                 continue
     return None
 
+def sheets_configured():
+    """A sheet ID and service account credentials are both present (GOOGLE_SHEET_ID has a default)."""
+    global _credentials_found
+    if not (getattr(Config, 'GOOGLE_SHEET_ID', None) or '').strip():
+        return False
+    if _credentials_found is None:
+        _credentials_found = _get_credentials() is not None
+    return _credentials_found
+
 def _get_worksheet():
-    """Get the first worksheet of the configured Google Sheet. Returns None on failure."""
-    global _sheet_client, _sheet_client_error
-    
+    """Get the first worksheet of the configured Google Sheet (cached). Returns None on failure."""
+    # Sheet API down or over quota: its circuit is open, so callers fall through to the next tier
+    if not backend_health.allow('sheets'):
+        return None
+    return _open_worksheet()
+
+def _open_worksheet():
+    global _sheet_client, _sheet_client_error, _worksheet
+
+    if _worksheet is not None:
+        return _worksheet
+
     sheet_id = (getattr(Config, 'GOOGLE_SHEET_ID', None) or '').strip()
     if not sheet_id:
         print("GOOGLE_SHEET_ID not configured")
@@ -61,14 +93,25 @@ def _get_worksheet():
             _sheet_client_error = None
         
         sheet = _sheet_client.open_by_key(sheet_id)
-        return sheet.get_worksheet(0)
+        _worksheet = sheet.get_worksheet(0)
+        return _worksheet
     except Exception as e:
         print(f"Google Sheet connection failed: {e}")
         import traceback
         traceback.print_exc()
         _sheet_client_error = str(e)
+        backend_health.failure('sheets', e)
         return None
 
+def _probe_sheets():
+    """Health probe for an open 'sheets' circuit: one cheap read of the header row."""
+    worksheet = _open_worksheet()
+    if worksheet is None:
+        raise RuntimeError(_sheet_client_error or 'worksheet unavailable')
+    worksheet.row_values(1)
+
+backend_health.set_probe('sheets', _probe_sheets)
+
 def update_sheet(data):
     if not getattr(Config, 'GOOGLE_SHEET_ID', None):
         print(f"Google Sheets not configured (GOOGLE_SHEET_ID missing). Would update: {data}")
@@ -79,72 +122,179 @@ def update_sheet(data):
         if worksheet is None:
             return
         worksheet.append_row(data)
+        backend_health.success('sheets')
         print(f"Sheet updated: {data}")
     except Exception as e:
         print(f"Sheet update failed: {e}")
+        backend_health.failure('sheets', e)
+    finally:
+        # Untracked append: row numbers must be re-read
+        invalidate_row_map()
+
+def _reset_worksheet():
+    """Drop the cached handle (and its row map / header check) so the next call reconnects."""
+    global _worksheet, _schema_checked
+    with _sheet_lock:
+        _worksheet = None
+        _schema_checked = False
+        invalidate_row_map()
+
+def invalidate_row_map():
+    """Forget the Ticket ID -> row map; it is rebuilt from column D on next use."""
+    global _row_map, _next_row
+    with _sheet_lock:
+        _row_map = None
+        _next_row = None
+
+SHEET_HEADERS = ['Name', 'Email', 'Phone', 'Ticket ID', 'Passes', 'Amount', 'Payment Status', 'Entry Status', 'Booking Date', 'Pass Type', 'Transaction ID', 'Discount Info']
+
+def _ensure_headers(worksheet):
+    """Create the header row, or add the Transaction ID / Discount Info columns if missing. Once per handle."""
+    global _schema_checked
+    if _schema_checked:
+        return
+    existing_headers = worksheet.row_values(1)
+    existing_headers_stripped = [h.strip() for h in existing_headers] if existing_headers else []
+
+    # Add new headers if missing
+    if not existing_headers:
+        worksheet.append_row(SHEET_HEADERS)
+    else:
+        # Check for Transaction ID (11th)
+        if len(existing_headers_stripped) < 11:
+            worksheet.update_cell(1, 11, 'Transaction ID')
+        # Check for Discount Info (12th)
+        if len(existing_headers_stripped) < 12:
+            worksheet.update_cell(1, 12, 'Discount Info')
+    _schema_checked = True
+
+def _build_row_map(ticket_column):
+    """Ticket ID column values (row 1 first) -> ({TICKET: row}, next_row)."""
+    row_map = {}
+    for idx, val in enumerate(ticket_column, start=1):
+        key = str(val).strip().upper()
+        if idx > 1 and key and key not in row_map:
+            row_map[key] = idx
+    return row_map, max(len(ticket_column) + 1, 2)
+
+def _get_row_map(worksheet):
+    """Ticket ID -> row map, reading column D only when no map is cached."""
+    global _row_map, _next_row
+    if _row_map is None:
+        _row_map, _next_row = _build_row_map(worksheet.col_values(4))  # Column D = Ticket ID
+    return _row_map
+
+def _reconcile_row_map(all_values):
+    """
+    Compare the cached map with a full sheet read (read_bookings_from_google_sheet).
+    A mismatch means someone edited the sheet outside this process: adopt the fresh map.
+    The caller holds _sheet_lock from before the read, so no write of ours can land in between.
+    """
+    with _sheet_lock:
+        previous = _row_map
+        _adopt_row_map(all_values)
+        if previous is not None and previous != _row_map:
+            print("Google Sheet changed outside the app; Ticket ID row map refreshed")
+
+def _adopt_row_map(all_values):
+    """Set the row map from a known full copy of the sheet's values."""
+    global _row_map, _next_row
+    fresh_map, fresh_next = _build_row_map([(str(r[3]) if len(r) > 3 else '') for r in all_values])
+    with _sheet_lock:
+        _row_map, _next_row = fresh_map, max(fresh_next, len(all_values) + 1)
+
+def _appended_start_row(response):
+    """First row number written by append_row(s), from the API response's updatedRange."""
+    try:
+        updated_range = response.get('updates', {}).get('updatedRange', '')
+        m = re.search(r'![A-Z]+(\d+)', updated_range)
+        return int(m.group(1)) if m else None
+    except Exception:
+        return None
+
+def _record_appended(keys, response):
+    """Add freshly appended tickets to the row map; an unexpected row means an external edit."""
+    global _next_row
+    start = _appended_start_row(response)
+    if start is None or start != _next_row:
+        print("Google Sheet append landed on an unexpected row; Ticket ID row map invalidated")
+        invalidate_row_map()
+        return
+    for offset, key in enumerate(keys):
+        _row_map[key] = start + offset
+    _next_row = start + len(keys)
+
+def _booking_to_row(booking_dict):
+    """Booking dict -> sheet row in SHEET_HEADERS order."""
+    return [
+        booking_dict.get('name', ''),
+        booking_dict.get('email', ''),
+        booking_dict.get('phone', ''),
+        (booking_dict.get('ticket_id') or '').strip(),
+        int(booking_dict.get('passes', 0) or 0),
+        int(booking_dict.get('amount', 0) or 0),
+        booking_dict.get('payment_status', ''),
+        booking_dict.get('entry_status', 'Not Used'),
+        booking_dict.get('booking_date', ''),
+        booking_dict.get('pass_type', 'entry'),
+        booking_dict.get('transaction_id', ''),
+        booking_dict.get('discount_description', ''),
+    ]
 
 def upsert_booking_row(booking_dict):
     """
     Upsert booking row by Ticket ID.
     This makes Google Sheet act as a persistent fallback store when Mongo is down.
+    With a warm row map an existing booking costs a single ranged update call.
+    """
+    return upsert_booking_rows([booking_dict])
+
+def upsert_booking_rows(bookings):
+    """
+    Upsert many bookings at once: one batch_update for rows that already exist and
+    one append_rows for new ones, located through the cached Ticket ID row map.
     """
     worksheet = _get_worksheet()
     if worksheet is None:
         return False
     try:
-        headers = ['Name', 'Email', 'Phone', 'Ticket ID', 'Passes', 'Amount', 'Payment Status', 'Entry Status', 'Booking Date', 'Pass Type', 'Transaction ID', 'Discount Info']
-        # Ensure header exists
-        existing_headers = worksheet.row_values(1)
-        existing_headers_stripped = [h.strip() for h in existing_headers] if existing_headers else []
-        
-        # Add new headers if missing
-        if not existing_headers:
-            worksheet.append_row(headers)
-        else:
-            # Check for Transaction ID (11th)
-            if len(existing_headers_stripped) < 11:
-                worksheet.update_cell(1, 11, 'Transaction ID')
-            # Check for Discount Info (12th)
-            if len(existing_headers_stripped) < 12:
-                worksheet.update_cell(1, 12, 'Discount Info')
-
-        ticket_id = (booking_dict.get('ticket_id') or '').strip()
-        if not ticket_id:
+        rows_by_ticket = {}
+        for booking_dict in bookings:
+            ticket_id = (booking_dict.get('ticket_id') or '').strip()
+            if ticket_id:
+                # Last write wins when the same ticket is queued twice
+                rows_by_ticket[ticket_id.upper()] = _booking_to_row(booking_dict)
+        if not rows_by_ticket:
             return False
 
-        row = [
-            booking_dict.get('name', ''),
-            booking_dict.get('email', ''),
-            booking_dict.get('phone', ''),
-            ticket_id,
-            int(booking_dict.get('passes', 0) or 0),
-            int(booking_dict.get('amount', 0) or 0),
-            booking_dict.get('payment_status', ''),
-            booking_dict.get('entry_status', 'Not Used'),
-            booking_dict.get('booking_date', ''),
-            booking_dict.get('pass_type', 'entry'),
-            booking_dict.get('transaction_id', ''),
-            booking_dict.get('discount_description', ''),
-        ]
+        with _sheet_lock:
+            _ensure_headers(worksheet)
+            row_map = _get_row_map(worksheet)
 
-        try:
-            # Find ticket id cell (search in column D which is Ticket ID)
-            all_values = worksheet.col_values(4)  # Column D = Ticket ID
-            row_num = None
-            for idx, val in enumerate(all_values, start=1):
-                if idx > 1 and str(val).strip().upper() == ticket_id.upper():
-                    row_num = idx
-                    break
-        except Exception:
-            row_num = None
-
-        if row_num and row_num > 1:
-            worksheet.update(f"A{row_num}:L{row_num}", [row])
-        else:
-            worksheet.append_row(row)
+            updates = []
+            new_keys, new_rows = [], []
+            for key, row in rows_by_ticket.items():
+                row_num = row_map.get(key)
+                if row_num:
+                    updates.append({'range': f"A{row_num}:L{row_num}", 'values': [row]})
+                else:
+                    new_keys.append(key)
+                    new_rows.append(row)
+
+            if len(updates) == 1:
+                worksheet.update(range_name=updates[0]['range'], values=updates[0]['values'])
+            elif updates:
+                worksheet.batch_update(updates)
+            if len(new_rows) == 1:
+                _record_appended(new_keys, worksheet.append_row(new_rows[0]))
+            elif new_rows:
+                _record_appended(new_keys, worksheet.append_rows(new_rows))
+        backend_health.success('sheets')
         return True
     except Exception as e:
         print(f"Sheet upsert failed: {e}")
+        backend_health.failure('sheets', e)
+        _reset_worksheet()
         return False
 
 def read_bookings_from_google_sheet():
@@ -153,8 +303,13 @@ def read_bookings_from_google_sheet():
     if worksheet is None:
         return []
     try:
-        # Get all data rows (skip header row 1)
-        all_values = worksheet.get_all_values()
+        # Get all data rows (skip header row 1). Held under the sheet lock together with the
+        # row map check: a row the flusher appends mid-read would otherwise drop out of the map.
+        with _sheet_lock:
+            all_values = worksheet.get_all_values()
+            # Free consistency check for the Ticket ID row map (detects external edits)
+            _reconcile_row_map(all_values)
+        backend_health.success('sheets')
         if len(all_values) < 2:
             return []
         
@@ -191,29 +346,45 @@ def read_bookings_from_google_sheet():
         print(f"Sheet read failed: {e}")
         import traceback
         traceback.print_exc()
+        backend_health.failure('sheets', e)
         return []
 
 def delete_booking_from_sheet(ticket_id):
     """Delete a booking row from Google Sheet by Ticket ID."""
+    global _next_row
     worksheet = _get_worksheet()
     if worksheet is None:
         return False
+    key = str(ticket_id).strip().upper()
     try:
-        # Find ticket id in column D (Ticket ID)
-        all_values = worksheet.col_values(4)  # Column D = Ticket ID
-        row_num = None
-        for idx, val in enumerate(all_values, start=1):
-            if idx > 1 and str(val).strip().upper() == str(ticket_id).strip().upper():
-                row_num = idx
-                break
-        
-        if row_num and row_num > 1:
+        with _sheet_lock:
+            row_num = _get_row_map(worksheet).get(key)
+            if not row_num:
+                return False
+
+            # Deleting the wrong row is unrecoverable: confirm the cell before trusting the map
+            if str(worksheet.acell(f"D{row_num}").value or '').strip().upper() != key:
+                print("Google Sheet changed outside the app; Ticket ID row map refreshed")
+                invalidate_row_map()
+                row_num = _get_row_map(worksheet).get(key)
+                if not row_num:
+                    return False
+
             worksheet.delete_rows(row_num)
-            print(f"Deleted booking {ticket_id} from sheet (row {row_num})")
-            return True
-        return False
+            # Every row below the deleted one moves up by one
+            del _row_map[key]
+            for k, r in _row_map.items():
+                if r > row_num:
+                    _row_map[k] = r - 1
+            if _next_row:
+                _next_row -= 1
+        backend_health.success('sheets')
+        print(f"Deleted booking {ticket_id} from sheet (row {row_num})")
+        return True
     except Exception as e:
         print(f"Sheet delete failed: {e}")
+        backend_health.failure('sheets', e)
+        _reset_worksheet()
         return False
 
 def sync_sheet_after_delete(bookings):
@@ -230,12 +401,46 @@ def sync_sheet_after_delete(bookings):
                 bdate = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         else:
             bdate = b.get('booking_date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        data.append([b.get('name'), b.get('email'), b.get('phone'), b.get('ticket_id'), b.get('passes'),
-                    b.get('amount', b.get('passes', 0) * 200), b.get('payment_status'),
-                    b.get('entry_status', 'Not Used'), bdate, b.get('pass_type', 'entry')])
+        data.append(_booking_to_row({
+            **b,
+            'amount': b.get('amount', b.get('passes', 0) * 200),
+            'booking_date': bdate,
+        }))
     return export_to_google_sheets(data)
 
+# Rows per batch_update request; keeps each payload well under the Sheets API request size limit
+EXPORT_CHUNK_ROWS = 2000
+
+def _cell_text(value):
+    return '' if value is None else str(value)
+
+def _changed_ranges(current, target, width):
+    """
+    Diff two row lists (row 1 first). Returns [(first_row, last_row)] runs of rows
+    whose values differ, so only those ranges are rewritten.
+    """
+    runs = []
+    start = None
+    for idx, row in enumerate(target, start=1):
+        old = current[idx - 1] if idx - 1 < len(current) else []
+        old = [_cell_text(v) for v in old[:width]] + [''] * (width - min(len(old), width))
+        new = [_cell_text(v) for v in row] + [''] * (width - len(row))
+        if old != new:
+            if start is None:
+                start = idx
+        elif start is not None:
+            runs.append((start, idx - 1))
+            start = None
+    if start is not None:
+        runs.append((start, len(target)))
+    return runs
+
 def export_to_google_sheets(bookings_data):
+    """
+    Make the sheet equal to header + bookings_data.
+    Reads the sheet once, rewrites only the row ranges that differ (batch_update, chunked
+    by EXPORT_CHUNK_ROWS) and clears leftover rows below the data.
+    """
     if not getattr(Config, 'GOOGLE_SHEET_ID', None):
         print("Google Sheets not configured (GOOGLE_SHEET_ID missing).")
         return False
@@ -244,20 +449,58 @@ def export_to_google_sheets(bookings_data):
         worksheet = _get_worksheet()
         if worksheet is None:
             return False
+
+        width = len(SHEET_HEADERS)
+        # Headers must match upsert_booking_row / read_bookings
+        target = [list(SHEET_HEADERS)] + [list(row)[:width] for row in bookings_data]
+
+        with _sheet_lock:
+            try:
+                current = worksheet.get_all_values()
+            except Exception as e:
+                print(f"Sheet read before export failed, rewriting everything: {e}")
+                current = []
+
+            last_col = gspread.utils.rowcol_to_a1(1, max(width, max((len(r) for r in current), default=0)))
+            last_col = re.sub(r'\d+', '', last_col)
+
+            # Values updates can't write past the grid: grow it first (new bookings since the last export)
+            if worksheet.row_count < len(target):
+                worksheet.add_rows(len(target) - worksheet.row_count)
+            if worksheet.col_count < width:
+                worksheet.add_cols(width - worksheet.col_count)
+
+            requests_batch = []
+            rows_in_batch = 0
+            for first, last in _changed_ranges(current, target, width):
+                for chunk_start in range(first, last + 1, EXPORT_CHUNK_ROWS):
+                    chunk_end = min(last, chunk_start + EXPORT_CHUNK_ROWS - 1)
+                    values = [[*row, *([''] * (width - len(row)))] for row in target[chunk_start - 1:chunk_end]]
+                    if rows_in_batch and rows_in_batch + len(values) > EXPORT_CHUNK_ROWS:
+                        worksheet.batch_update(requests_batch)
+                        requests_batch, rows_in_batch = [], 0
+                    requests_batch.append({'range': f"A{chunk_start}:L{chunk_end}", 'values': values})
+                    rows_in_batch += len(values)
+            if requests_batch:
+                worksheet.batch_update(requests_batch)
+
+            # Leftovers: rows below the new data and any columns past L
+            stale = []
+            if len(current) > len(target):
+                stale.append(f"A{len(target) + 1}:L{len(current)}")
+            if last_col != 'L':
+                stale.append(f"M1:{last_col}{len(current)}")
+            if stale:
+                worksheet.batch_clear(stale)
+
+            # We know exactly what the sheet holds now
+            _adopt_row_map(target)
         
-        # Clear existing data
-        worksheet.clear()
-        
-        # Add headers (must match upsert_booking_row / read_bookings)
-        headers = ['Name', 'Email', 'Phone', 'Ticket ID', 'Passes', 'Amount', 'Payment Status', 'Entry Status', 'Booking Date', 'Pass Type', 'Transaction ID']
-        worksheet.append_row(headers)
-        
-        # Add data
-        for row in bookings_data:
-            worksheet.append_row(row)
-        
+        backend_health.success('sheets')
         print("Google Sheet updated with all bookings.")
         return True
     except Exception as e:
         print(f"Google Sheet export failed: {e}")
-        return False
\ No newline at end of file
+        backend_health.failure('sheets', e)
+        _reset_worksheet()
+        return False
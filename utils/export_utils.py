@@ -0,0 +1,139 @@
+"""Bookings export (CSV / XLSX) written row by row so memory stays flat as bookings grow."""
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from config import Config
+from utils.excel_utils import SHEET_HEADERS
+
+# Same columns as the Google Sheet
+EXPORT_HEADERS = SHEET_HEADERS
+
+EXPORT_FORMATS = ('xlsx', 'csv')
+
+# XLSX exports stay in memory up to this size, then spill to a temp file
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def _booking_date(booking):
+    bdate = booking.get('booking_date', '')
+    if not bdate and booking.get('_id') and hasattr(booking['_id'], 'generation_time'):
+        try:
+            bdate = booking['_id'].generation_time.replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S')
+        except Exception:
+            bdate = ''
+    return str(bdate or datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def export_row(booking):
+    """One booking as a row in EXPORT_HEADERS order."""
+    return [
+        booking.get('name', ''),
+        booking.get('email', ''),
+        booking.get('phone', ''),
+        booking.get('ticket_id', ''),
+        booking.get('passes', 0),
+        booking.get('amount', booking.get('passes', 0) * 200),
+        booking.get('payment_status', 'Pending'),
+        booking.get('entry_status', 'Not Used'),
+        _booking_date(booking),
+        booking.get('pass_type', 'entry'),
+        booking.get('transaction_id', ''),
+        booking.get('discount_description', ''),
+    ]
+
+
+def iter_csv(bookings):
+    """Yield the CSV export a line at a time (header first, UTF-8 BOM so Excel detects the encoding)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_HEADERS)
+    yield '\ufeff' + buf.getvalue()
+    for booking in bookings:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(export_row(booking))
+        yield buf.getvalue()
+
+
+def write_xlsx(bookings, path=None):
+    """
+    Write the XLSX export with openpyxl's write-only mode (rows are streamed to the file,
+    no cell objects kept). Saves to `path` when given, otherwise returns a
+    SpooledTemporaryFile positioned at the start.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Bookings')
+    ws.append(EXPORT_HEADERS)
+    for booking in bookings:
+        ws.append(export_row(booking))
+    if path is not None:
+        wb.save(path)
+        return path
+    out = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES, suffix='.xlsx')
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+def export_dir():
+    """Built export files: DATA_DIR/exports (the system temp dir when DATA_DIR is unset)."""
+    base = (getattr(Config, 'DATA_DIR', '') or '').strip() or tempfile.gettempdir()
+    return os.path.join(base, 'exports')
+
+
+def artifact_name(data_version, export_format):
+    return f"bookings-{data_version}.{export_format}"
+
+
+def cached_artifact(data_version, export_format):
+    """File name of an export already built from this data version, or None."""
+    name = artifact_name(data_version, export_format)
+    return name if os.path.exists(os.path.join(export_dir(), name)) else None
+
+
+def build_artifact(bookings, data_version, export_format):
+    """
+    Write the export for `data_version` to export_dir() (atomically) and prune old files,
+    keeping the newest EXPORT_CACHE_KEEP. Returns (file name, number of rows).
+    """
+    directory = export_dir()
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='tmp_', suffix=f'.{export_format}', dir=directory)
+    rows = 0
+
+    def counted(items):
+        nonlocal rows
+        for booking in items:
+            rows += 1
+            yield booking
+
+    try:
+        if export_format == 'csv':
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                for chunk in iter_csv(counted(bookings)):
+                    f.write(chunk)
+        else:
+            os.close(fd)
+            write_xlsx(counted(bookings), tmp_path)
+        name = artifact_name(data_version, export_format)
+        os.replace(tmp_path, os.path.join(directory, name))
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    _prune(directory, keep=int(getattr(Config, 'EXPORT_CACHE_KEEP', 6) or 6))
+    return name, rows
+
+
+def _prune(directory, keep):
+    try:
+        files = [os.path.join(directory, n) for n in os.listdir(directory) if n.startswith('bookings-')]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[keep:]:
+            os.unlink(path)
+    except OSError as e:
+        print(f"Export cache prune failed (non-fatal): {e}")
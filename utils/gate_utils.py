@@ -0,0 +1,172 @@
+"""
+Offline-capable gate support: HMAC-signed QR payloads and a compact manifest of valid tickets.
+
+QR payload (QR alphanumeric charset, so the code stays small):
+    SPH1.<TICKET_ID>.<pass code><passes>.<signature>
+    e.g. SPH1.3F9A01BC.S2.MZXW6YTBOI3DAMRT
+The signature is the first 10 bytes of HMAC-SHA256 over everything before it, base32.
+The HMAC key is derived from SECRET_KEY (never SECRET_KEY itself, which also signs sessions).
+
+Manifest (binary, big-endian), paid tickets sorted by key so gates can binary-search it:
+    header  b'SPHM' | u16 format | 8-byte epoch | u64 version | 4-byte key id | u32 count
+    record  8-byte key (blake2b of the normalized ticket ID) | u8 passes | u8 pass code | u8 flags
+flags bit 0 = already checked in. A delta (since=<version>) has the same layout with
+u8 op (1 = upsert, 0 = remove) before each record.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import threading
+from collections import deque
+
+from config import Config
+from utils.booking_index import normalize
+
+QR_PREFIX = 'SPH1'
+SIGNATURE_BYTES = 10
+
+PASS_CODES = {'entry': 'E', 'entry_starter': 'S', 'entry_starter_lunch': 'L'}
+PASS_TYPES = {code: pass_type for pass_type, code in PASS_CODES.items()}
+
+MANIFEST_MAGIC = b'SPHM'
+MANIFEST_FORMAT = 1
+HEADER = struct.Struct('>4sH8sQ4sI')
+RECORD = struct.Struct('>8sBBB')
+DELTA_RECORD = struct.Struct('>B8sBBB')
+FLAG_USED = 1
+
+
+def qr_key():
+    secret = (getattr(Config, 'SECRET_KEY', '') or '').encode('utf-8')
+    return hmac.new(secret, b'spectra-holiparty/ticket-qr/v1', hashlib.sha256).digest()
+
+
+def key_id():
+    """Short fingerprint of the QR key (changes when SECRET_KEY does); safe to publish."""
+    return hashlib.sha256(qr_key()).digest()[:4]
+
+
+def _signature(message):
+    digest = hmac.new(qr_key(), message.encode('utf-8'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+    return base64.b32encode(digest).decode('ascii')
+
+
+def sign_ticket(booking):
+    """QR payload for a booking: ticket ID, pass type and passes, signed."""
+    ticket_id = normalize(booking.get('ticket_id'))
+    code = PASS_CODES.get(booking.get('pass_type') or 'entry', 'X')
+    message = f"{QR_PREFIX}.{ticket_id}.{code}{int(booking.get('passes') or 1)}"
+    return f"{message}.{_signature(message)}"
+
+
+def is_signed_payload(value):
+    return str(value or '').strip().upper().startswith(QR_PREFIX + '.')
+
+
+def verify_ticket(payload):
+    """{'ticket_id', 'pass_type', 'passes'} when the payload's signature is valid, else None."""
+    parts = str(payload or '').strip().upper().split('.')
+    if len(parts) != 4 or parts[0] != QR_PREFIX or len(parts[2]) < 2:
+        return None
+    message = '.'.join(parts[:3])
+    if not hmac.compare_digest(parts[3], _signature(message)):
+        return None
+    try:
+        passes = int(parts[2][1:])
+    except ValueError:
+        return None
+    return {'ticket_id': parts[1], 'pass_type': PASS_TYPES.get(parts[2][0], 'entry'), 'passes': passes}
+
+
+def manifest_key(ticket_id):
+    return hashlib.blake2b(normalize(ticket_id).encode('utf-8'), digest_size=8).digest()
+
+
+def _record_fields(booking):
+    passes = max(0, min(255, int(booking.get('passes') or 1)))
+    code = ord(PASS_CODES.get(booking.get('pass_type') or 'entry', 'X'))
+    flags = FLAG_USED if booking.get('entry_status') == 'Used' else 0
+    return passes, code, flags
+
+
+class GateManifest:
+    """
+    Paid tickets as fixed-width records, rebuilt from the booking index when its data
+    version changes. Each rebuild that changes anything bumps `version` and logs the
+    changed keys, so gates can fetch just the delta since the version they hold.
+    `epoch` is random per process: a gate holding another epoch's version gets a full file.
+    """
+
+    def __init__(self, max_log=50000):
+        self.max_log = max_log
+        self.epoch = os.urandom(8)
+        self.version = 0
+        self._records = {}  # key -> (passes, code, flags)
+        self._log = deque()  # (version, key, fields or None)
+        self._data_version = None
+        self._full = None  # (version, bytes)
+        self._lock = threading.Lock()
+
+    def refresh(self, data_version, bookings):
+        """Bring the records up to date with `bookings` (an iterable of dicts) if data changed."""
+        if data_version == self._data_version:
+            return self.version
+        with self._lock:
+            if data_version == self._data_version:
+                return self.version
+            records = {}
+            for booking in bookings:
+                if booking.get('payment_status') == 'Paid' and normalize(booking.get('ticket_id')):
+                    records[manifest_key(booking['ticket_id'])] = _record_fields(booking)
+            changes = [(k, v) for k, v in records.items() if self._records.get(k) != v]
+            changes += [(k, None) for k in self._records if k not in records]
+            if changes:
+                self.version += 1
+                self._log.extend((self.version, k, v) for k, v in changes)
+                while len(self._log) > self.max_log:
+                    self._log.popleft()
+                self._records = records
+            self._data_version = data_version
+            return self.version
+
+    def token(self):
+        return f"{self.epoch.hex()}-{self.version}"
+
+    def _header(self, count):
+        return HEADER.pack(MANIFEST_MAGIC, MANIFEST_FORMAT, self.epoch, self.version, key_id(), count)
+
+    def full(self):
+        """The whole manifest (cached per version)."""
+        with self._lock:
+            if self._full is None or self._full[0] != self.version:
+                body = b''.join(RECORD.pack(k, *self._records[k]) for k in sorted(self._records))
+                self._full = (self.version, self._header(len(self._records)) + body)
+            return self._full[1]
+
+    def delta(self, since_token):
+        """Changes since `since_token` (from token()), or None when a full download is needed."""
+        try:
+            epoch_hex, since = since_token.split('-', 1)
+            since = int(since)
+        except (AttributeError, ValueError):
+            return None
+        with self._lock:
+            if epoch_hex != self.epoch.hex() or since > self.version:
+                return None
+            if self._log and self._log[0][0] > since + 1:
+                return None  # the log no longer reaches back that far
+            if not self._log and since < self.version:
+                return None
+            latest = {}
+            for version, key, fields in self._log:
+                if version > since:
+                    latest[key] = fields
+            body = b''.join(
+                DELTA_RECORD.pack(0, k, 0, 0, 0) if v is None else DELTA_RECORD.pack(1, k, *v)
+                for k, v in sorted(latest.items()))
+            return self._header(len(latest)) + body
+
+
+gate_manifest = GateManifest()
@@ -0,0 +1,176 @@
+"""Per-backend circuit breakers (Mongo, Google Sheets, email) with a background recovery probe."""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through; `failure_threshold` consecutive failures open the circuit.
+    open: calls are skipped (callers fall through to the next tier) for `cooldown` seconds.
+    half_open: after the cooldown one trial is let through - the background probe when the
+    backend has one, otherwise the next real call. Success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=3, cooldown=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe = None
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._trial_at = 0
+        self.last_error = None
+        self.last_success_at = None
+        self.last_failure_at = None
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        now = time.time()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.probe is not None or now - self.opened_at < self.cooldown:
+                return False
+            # No probe: the caller is the trial. A trial that never reported back is retried.
+            if self.state == HALF_OPEN and now - self._trial_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self._trial_at = now
+            return True
+
+    def due_for_probe(self):
+        return self.probe is not None and self.state != CLOSED and time.time() - self.opened_at >= self.cooldown
+
+    def record_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self.last_success_at = time.time()
+        if recovered:
+            print(f"Circuit '{self.name}' closed: backend is reachable again")
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error is not None else None
+            self.last_failure_at = time.time()
+            if self.state == CLOSED and self.failures < self.failure_threshold:
+                return False
+            was_open = self.state == OPEN
+            self.state = OPEN
+            self.opened_at = time.time()
+        if not was_open:
+            print(f"Circuit '{self.name}' opened after {self.failures} failure(s) ({error}); "
+                  f"skipping it for {self.cooldown}s")
+        return True
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_in_s': round(max(0, self.opened_at + self.cooldown - time.time()), 1) if self.state != CLOSED else 0,
+            'last_error': self.last_error,
+            'last_success_at': _fmt(self.last_success_at),
+            'last_failure_at': _fmt(self.last_failure_at),
+        }
+
+
+def _fmt(ts):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) if ts else None
+
+
+class BackendHealth:
+    """Named circuit breakers plus one per-process thread that probes open circuits."""
+
+    def __init__(self, failure_threshold=3, cooldown=30, probe_interval=10):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._prober_pid = None
+
+    def breaker(self, name):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    name, CircuitBreaker(name, self.failure_threshold, self.cooldown))
+        return breaker
+
+    def set_probe(self, name, probe):
+        """probe() raises when the backend is unreachable; used to close an open circuit."""
+        self.breaker(name).probe = probe
+
+    def allow(self, name):
+        return self.breaker(name).allow()
+
+    def success(self, name):
+        self.breaker(name).record_success()
+
+    def failure(self, name, error=None):
+        if self.breaker(name).record_failure(error):
+            self._ensure_prober()
+
+    @contextmanager
+    def track(self, name, ignore=()):
+        """Record the outcome of a backend call; exceptions in `ignore` (data errors) don't count."""
+        try:
+            yield
+        except ignore:
+            raise
+        except Exception as e:
+            self.failure(name, e)
+            raise
+        self.success(name)
+
+    def snapshot(self):
+        return {name: b.snapshot() for name, b in sorted(self._breakers.items())}
+
+    def _ensure_prober(self):
+        # Threads don't survive gunicorn's fork (preload=True), so start one per process
+        pid = os.getpid()
+        if self._prober_pid == pid or not self.probe_interval:
+            return
+        with self._lock:
+            if self._prober_pid == pid:
+                return
+            self._prober_pid = pid
+            threading.Thread(target=self._probe_loop, name='backend-health-probe', daemon=True).start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            for breaker in list(self._breakers.values()):
+                if not breaker.due_for_probe():
+                    continue
+                try:
+                    breaker.probe()
+                except Exception as e:
+                    breaker.record_failure(e)
+                else:
+                    breaker.record_success()
+
+
+def _health_from_config():
+    from config import Config
+    return BackendHealth(
+        failure_threshold=int(getattr(Config, 'BREAKER_FAILURE_THRESHOLD', 3) or 3),
+        cooldown=float(getattr(Config, 'BREAKER_COOLDOWN', 30) or 30),
+        probe_interval=float(getattr(Config, 'HEALTH_PROBE_SECONDS', 10) or 0),
+    )
+
+
+backend_health = _health_from_config()
@@ -0,0 +1,408 @@
+"""
+Background jobs (ticket PDF + email sends) so admin clicks and form posts never wait on a
+third-party API.
+
+JOB_BACKEND=thread (default): a bounded thread pool inside the web process; job status kept in memory.
+JOB_BACKEND=store: the web process only records jobs in DATA_DIR/jobs.db (SQLite); run
+`python -m utils.jobs` as a separate worker process to execute them.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+# Job lifecycle; handlers can rename the running/done states (mail jobs: sending/sent)
+QUEUED = 'queued'
+FAILED = 'failed'
+
+
+def _now():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _data_path(filename):
+    base = (getattr(Config, 'DATA_DIR', '') or '').strip()
+    return os.path.join(base, filename) if base else filename
+
+
+class MemoryJobStore:
+    """Job records for the in-process backend (most recent `max_jobs` kept)."""
+
+    def __init__(self, max_jobs=5000):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._latest_by_key = {}
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = job
+            if job.get('key'):
+                self._latest_by_key[(job['kind'], job['key'])] = job['id']
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs))
+                old = self._jobs.pop(oldest)
+                if self._latest_by_key.get((old['kind'], old.get('key'))) == oldest:
+                    del self._latest_by_key[(old['kind'], old.get('key'))]
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields, updated_at=_now())
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def latest(self, kind, key):
+        job_id = self._latest_by_key.get((kind, key))
+        return self.get(job_id) if job_id else None
+
+
+class SqliteJobStore:
+    """Job records shared between the web process and `python -m utils.jobs` workers."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, key TEXT, payload TEXT,"
+            " status TEXT NOT NULL, message TEXT, result TEXT, attempts INTEGER DEFAULT 0,"
+            " created_at TEXT, updated_at TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(kind, key, created_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'] or '{}')
+        job['result'] = json.loads(job['result']) if job.get('result') else None
+        return job
+
+    def add(self, job):
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, key, payload, status, message, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job['id'], job['kind'], job.get('key'), json.dumps(job['payload'], default=str),
+             job['status'], job.get('message', ''), job['created_at'], job['updated_at']),
+        )
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], default=str)
+        fields['updated_at'] = _now()
+        cols = ', '.join(f"{k} = ?" for k in fields)
+        self._conn().execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        return self._row(self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest(self, kind, key):
+        return self._row(self._conn().execute(
+            "SELECT * FROM jobs WHERE kind = ? AND key = ? ORDER BY created_at DESC, rowid DESC LIMIT 1",
+            (kind, key),
+        ).fetchone())
+
+    def claim_next(self, running_labels):
+        """Atomically move the oldest queued job to its running state. Returns the job or None."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at, rowid LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            status = running_labels.get(row['kind'], 'running')
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (status, _now(), row['id']),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = self._row(row)
+        job['status'] = status
+        return job
+
+
+class JobQueue:
+    """
+    submit(kind, payload, key) records a job and returns it immediately; a handler registered
+    for `kind` runs it later. Handlers return (ok, message) or (ok, message, result).
+    """
+
+    def __init__(self, backend='thread', max_workers=2):
+        self.backend = backend
+        self.max_workers = max_workers
+        self._handlers = {}
+        self._labels = {}
+        self._store = None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            if self.backend == 'store':
+                self._store = SqliteJobStore(_data_path('jobs.db'))
+            else:
+                self._store = MemoryJobStore()
+        return self._store
+
+    def register(self, kind, handler, running='running', done='done'):
+        self._handlers[kind] = handler
+        self._labels[kind] = (running, done)
+
+    def _pool(self):
+        # Executor threads don't survive gunicorn's fork (preload=True): one pool per process
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+                    self._executor_pid = pid
+        return self._executor
+
+    def submit(self, kind, payload, key=None, dedupe=True):
+        """Queue a job. With dedupe, an identical kind+key job that hasn't finished is returned instead."""
+        if kind not in self._handlers:
+            raise ValueError(f"No job handler registered for '{kind}'")
+        if key and dedupe:
+            existing = self.store.latest(kind, key)
+            if existing and existing['status'] in (QUEUED, self._labels[kind][0]):
+                return existing
+        now = _now()
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'kind': kind,
+            'key': key,
+            'payload': payload,
+            'status': QUEUED,
+            'message': '',
+            'result': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self.store.add(job)
+        if self.backend != 'store':
+            self._pool().submit(self._run, dict(job))
+        return dict(job)
+
+    def _run(self, job):
+        running, done = self._labels.get(job['kind'], ('running', 'done'))
+        if job.get('status') != running:
+            self.store.update(job['id'], status=running)
+        try:
+            outcome = self._handlers[job['kind']](job['payload'], job)
+            ok, message = outcome[0], outcome[1]
+            result = outcome[2] if len(outcome) > 2 else None
+            self.store.update(job['id'], status=done if ok else FAILED, message=message or '', result=result)
+        except Exception as e:
+            print(f"Job {job['kind']} {job['id']} failed: {e}")
+            import traceback
+            traceback.print_exc()
+            self.store.update(job['id'], status=FAILED, message=f"Error: {str(e)}")
+
+    def progress(self, job_id, message):
+        """Handlers call this to publish progress text for long jobs."""
+        self.store.update(job_id, message=message)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def latest(self, kind, key):
+        return self.store.latest(kind, key)
+
+    def shutdown(self, wait=True):
+        """Let queued in-process jobs finish (gunicorn worker_exit)."""
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def work_forever(self, poll_interval=1.0):
+        """Out-of-process worker loop for JOB_BACKEND=store."""
+        running_labels = {kind: labels[0] for kind, labels in self._labels.items()}
+        print(f"Job worker started (store: {self.store.path}, threads: {self.max_workers})")
+        pool = self._pool()
+        slots = threading.BoundedSemaphore(self.max_workers)
+        while True:
+            slots.acquire()
+            job = self.store.claim_next(running_labels)
+            if job is None:
+                slots.release()
+                time.sleep(poll_interval)
+                continue
+
+            def run(j=job):
+                try:
+                    self._run(j)
+                finally:
+                    slots.release()
+            pool.submit(run)
+
+
+job_queue = JobQueue(
+    backend=(getattr(Config, 'JOB_BACKEND', 'thread') or 'thread').strip().lower(),
+    max_workers=int(getattr(Config, 'JOB_WORKERS', 2) or 2),
+)
+
+
+# ---- handlers ---------------------------------------------------------------------------
+
+TICKET_EMAIL_SUBJECT = "🎉 Spectra HoliParty 2026 - Your Entry Pass Confirmed! 🎉"
+
+
+def _booking_with_event(booking, content):
+    return {
+        **booking,
+        'venue': content.get('venue', 'Kunjachaya, Bhadreswar'),
+        'event_date': content.get('event_date', 'March 3, 2026'),
+        'pricing': content.get('pricing', {}),
+    }
+
+
+def send_ticket_email(payload, job=None):
+    """Generate the PDF ticket and send the confirmation email for payload['ticket_id']."""
+    from models import Booking, EventContent
+    from utils.email_utils import send_email, create_success_email_template
+    from utils.ticket_utils import generate_ticket_pdf
+
+    booking = Booking.find_one(ticket_id=payload['ticket_id'])
+    if not booking:
+        return False, f"Booking with ticket ID {payload['ticket_id']} not found"
+    content = EventContent.get_content()
+    booking_with_venue = _booking_with_event(booking, content)
+    if payload.get('payment_status'):
+        booking_with_venue['payment_status'] = payload['payment_status']
+
+    pdf_buf = generate_ticket_pdf(booking_with_venue)
+    email_body = create_success_email_template(booking_with_venue, content)
+    if send_email(booking['email'], TICKET_EMAIL_SUBJECT, email_body, pdf_buf):
+        print(f"Ticket email sent successfully to {booking['email']} for {booking['ticket_id']}")
+        provider = getattr(Config, 'EMAIL_PROVIDER', None) or 'resend'
+        return True, f'Email sent successfully via {provider.upper()}!'
+
+    print(f"Failed to send ticket email to {booking['email']} for {booking['ticket_id']}")
+    provider = getattr(Config, 'EMAIL_PROVIDER', None) or 'resend'
+    if provider == 'resend':
+        return False, (
+            'Email not sent. With onboarding@resend.dev you can only send to your Resend account email. '
+            'To send to customers, verify a domain at resend.com/domains OR set EMAIL_PROVIDER=smtp to use Gmail.'
+        )
+    return False, f'Email send failed. Check Render logs for details. Provider: {provider.upper()}'
+
+
+def send_failure_email(payload, job=None):
+    """Payment-verification-required email for payload['ticket_id']."""
+    from models import Booking
+    from utils.email_utils import send_email
+
+    booking = Booking.find_one(ticket_id=payload['ticket_id'])
+    if not booking:
+        return False, f"Booking with ticket ID {payload['ticket_id']} not found"
+    body = f"""
+    <h2>Dear {booking['name']},</h2>
+    <p>Greetings from <strong>Spectra Team</strong>!</p>
+    <p>We noticed your booking for <strong>Spectra HoliParty 2026</strong> (Ticket ID: {booking['ticket_id']}) could not be confirmed due to payment verification issues.</p>
+    {f"<p>Transaction ID submitted: {booking.get('transaction_id', 'Not provided')}</p>" if booking.get('transaction_id') else ""}
+    <p>If you have already made the payment, please contact us with your Ticket ID for manual verification.</p>
+    <p>For any queries, reach us at the numbers on our website.</p>
+    <p>— Spectra HoliParty Team</p>
+    """
+    if send_email(booking['email'], "Spectra HoliParty 2026 - Payment Verification Required", body):
+        return True, 'Email sent successfully!'
+    return False, 'Email send failed. Check Render logs for details.'
+
+
+def send_contact_email(payload, job=None):
+    from utils.email_utils import send_contact_form_email
+    sent = send_contact_form_email(payload.get('name', ''), payload.get('email', ''), payload.get('phone', ''),
+                                   payload.get('subject', ''), payload.get('message', ''))
+    return (True, 'Contact message delivered') if sent else (False, 'Contact email send failed')
+
+
+def sync_sheet_export(payload, job=None):
+    """Rewrite the Google Sheet from every booking (the sheet half of the old Export button)."""
+    from models import Booking
+    from utils.excel_utils import export_to_google_sheets
+    from utils.export_utils import export_row
+
+    rows = [export_row(b) for b in Booking.find_all()]
+    if export_to_google_sheets(rows):
+        return True, f'Google Sheet synced ({len(rows)} bookings)'
+    return False, 'Google Sheet sync failed or not configured'
+
+
+def build_bookings_export(payload, job=None):
+    """Build (or reuse) the export file for the current bookings; the result names the file."""
+    from models import Booking
+    from utils.export_utils import build_artifact, cached_artifact
+
+    export_format = payload.get('format', 'xlsx')
+    data_version = Booking.data_version()
+    name = cached_artifact(data_version, export_format)
+    if name:
+        return True, 'Export ready (unchanged bookings, cached)', {
+            'file': name, 'format': export_format, 'data_version': data_version, 'cached': True}
+    name, rows = build_artifact(Booking.iter_all(), data_version, export_format)
+    return True, f'Export ready ({rows} bookings)', {
+        'file': name, 'format': export_format, 'data_version': data_version, 'rows': rows, 'cached': False}
+
+
+def build_ticket_bundle(payload, job=None):
+    """Render every paid ticket into the bundle (resumes from already rendered files)."""
+    from utils.bulk_tickets import build_bundle, paid_bookings
+
+    def report(done, total, rate):
+        if job:
+            job_queue.progress(job['id'], f'{done}/{total} tickets rendered ({rate:.1f} tickets/sec)')
+
+    summary = build_bundle(list(paid_bookings()), progress=report)
+    message = f"{summary['tickets']} tickets ready ({summary['rendered']} rendered, {summary['reused']} reused"
+    if summary['tickets_per_sec']:
+        message += f", {summary['tickets_per_sec']} tickets/sec on {summary['workers']} processes"
+    return True, message + ')', summary
+
+
+job_queue.register('ticket_email', send_ticket_email, running='sending', done='sent')
+job_queue.register('failure_email', send_failure_email, running='sending', done='sent')
+job_queue.register('contact_email', send_contact_email, running='sending', done='sent')
+job_queue.register('sheet_sync', sync_sheet_export)
+job_queue.register('bookings_export', build_bookings_export, running='building', done='ready')
+job_queue.register('ticket_bundle', build_ticket_bundle, running='rendering', done='ready')
+
+
+if __name__ == '__main__':
+    if job_queue.backend != 'store':
+        print("JOB_BACKEND is not 'store'; this worker only runs jobs recorded in DATA_DIR/jobs.db")
+        job_queue.backend = 'store'
+    job_queue.work_forever()
@@ -0,0 +1,75 @@
+"""
+Rendered public pages (/, /about, /contact): their only input is the event content, so each
+template is rendered once per content document and kept as raw, gzip and (when the brotli
+package is installed) brotli bodies with a shared weak ETag.
+"""
+import gzip
+import hashlib
+import threading
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+
+class CachedPage:
+    __slots__ = ('content', 'etag', 'bodies')
+
+    def __init__(self, content, html):
+        raw = html.encode('utf-8')
+        self.content = content
+        self.etag = hashlib.blake2b(raw, digest_size=8).hexdigest()
+        self.bodies = {'identity': raw, 'gzip': gzip.compress(raw, 9)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(raw, quality=11)
+
+    def response(self, request):
+        headers = {
+            'ETag': f'W/"{self.etag}"',
+            'Vary': 'Accept-Encoding',
+            # Browsers revalidate every time: a content save shows up on the next load
+            'Cache-Control': 'public, no-cache',
+        }
+        if request.if_none_match.contains_weak(self.etag):
+            return Response(status=304, headers=headers)
+        # Substring check, not a full q-value parse: clients send 'gzip, deflate, br'
+        accept = request.headers.get('Accept-Encoding', '')
+        encoding = 'br' if 'br' in accept and 'br' in self.bodies else 'gzip' if 'gzip' in accept else 'identity'
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(self.bodies[encoding], mimetype='text/html', headers=headers)
+
+
+class PageCache:
+    """
+    template -> CachedPage. A hit is one dict lookup plus an identity check against the
+    content document EventContent.get_content() returned; when that document is replaced
+    (a save, seen by every worker through the content version check) the page re-renders.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template, content, render):
+        page = self._pages.get(template)
+        if page is not None and page.content is content:
+            self.hits += 1
+            return page
+        self.misses += 1
+        page = CachedPage(content, render())
+        with self._lock:
+            self._pages[template] = page
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+page_cache = PageCache()
@@ -10,4 +10,15 @@ def generate_qr(ticket_id):
     buf = io.BytesIO()
     img.save(buf, format='PNG')
     buf.seek(0)
-    return buf
\ No newline at end of file
+    return buf
+
+# Any of the eight masks decodes; choosing the "best" one scores all eight and is ~85% of
+# the encode time for a signed ticket payload, so the ticket path uses a fixed one.
+TICKET_QR_MASK = 0
+
+def qr_matrix(data):
+    """QR module matrix (rows of booleans, True = dark) without quiet zone; no image is built."""
+    qr = qrcode.QRCode(version=1, border=0, mask_pattern=TICKET_QR_MASK)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
@@ -1,42 +1,108 @@
 """Generate Spectra HoliParty PDF tickets with name, ticket ID, and amount highlighted."""
+import copy
+import hashlib
 import io
+import json
 import os
 import tempfile
+import threading
+import zlib
+from collections import OrderedDict
 from fpdf import FPDF
-from PIL import Image
 
+# Bump when the ticket layout changes so cached PDFs are not reused
+TICKET_RENDER_VERSION = 3
 
-def generate_ticket_pdf(booking):
-    """Generate a PDF ticket for the booking. Returns BytesIO buffer."""
-    qr_path = None
-    try:
-        from utils.qr_utils import generate_qr
-        qr_buf = generate_qr(booking.get('ticket_id', 'N/A'))
-        qr_img = Image.open(qr_buf)
-        fd, qr_path = tempfile.mkstemp(suffix='.png')
-        os.close(fd)
-        qr_img.save(qr_path, format='PNG')
-    except Exception:
-        if qr_path and os.path.exists(qr_path):
+# Quiet zone around the QR code, in modules (matches the old 10px-box PNG's border=5)
+QR_QUIET_ZONE = 5
+
+# Booking fields that appear on the ticket (the cache key)
+TICKET_FIELDS = ('name', 'ticket_id', 'amount', 'passes', 'pass_type', 'venue', 'event_date',
+                 'is_couple_booking', 'is_group_booking')
+
+
+class TicketCache:
+    """
+    Rendered ticket PDFs keyed by a hash of the fields printed on them.
+    Bounded in-memory LRU, plus an optional directory tier (DATA_DIR/ticket_cache).
+    """
+
+    def __init__(self, max_entries=256, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.directory:
             try:
-                os.unlink(qr_path)
-            except Exception:
+                with open(os.path.join(self.directory, f"{key}.pdf"), 'rb') as f:
+                    data = f.read()
+                self._remember(key, data)
+                self.hits += 1
+                return data
+            except OSError:
                 pass
-        qr_path = None
+        self.misses += 1
+        return None
 
-    pass_type_labels = {
-        'entry': 'Entry Only',
-        'entry_starter': 'Entry + Starter',
-        'entry_starter_lunch': 'Entry + Starter + Lunch'
-    }
-    pass_label = pass_type_labels.get(booking.get('pass_type', 'entry'), 'Entry Only')
-    if booking.get('is_couple_booking'):
-        pass_label += " (Couple Offer)"
-    elif booking.get('is_group_booking'):
-        if booking.get('passes', 1) >= 8:
-             pass_label += " (Group 15% Off)"
-        else:
-             pass_label += " (Group 10% Off)"
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(suffix='.pdf', dir=self.directory)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, os.path.join(self.directory, f"{key}.pdf"))
+            except OSError as e:
+                print(f"Ticket disk cache write failed (non-fatal): {e}")
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.pdf'):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+
+def _ticket_cache_from_config():
+    from config import Config
+    base = (getattr(Config, 'DATA_DIR', '') or '').strip()
+    directory = os.path.join(base, 'ticket_cache') if base and getattr(Config, 'TICKET_DISK_CACHE', True) else None
+    return TicketCache(max_entries=int(getattr(Config, 'TICKET_CACHE_SIZE', 256) or 256), directory=directory)
+
+
+ticket_cache = _ticket_cache_from_config()
+
+
+def clear_ticket_cache():
+    """Drop every cached ticket and skeleton (EventContent calls this when venue or event date change)."""
+    ticket_cache.clear()
+    with _skeletons_lock:
+        _skeletons.clear()
+
+
+def _ticket_amount(booking):
     amount = booking.get('amount')
     if amount is None:
         # Fallback logic if amount is missing
@@ -50,75 +116,332 @@ def generate_ticket_pdf(booking):
         elif pass_type == 'entry_starter_lunch':
             price_per_pass = pricing.get('entry_plus_starter_lunch', 500)
         amount = booking.get('passes', 1) * price_per_pass
-    venue = booking.get('venue', 'Kunjachaya, Bhadreswar')
+    return amount
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
 
-    # Header - Spectra HoliParty
-    pdf.set_font("Arial", 'B', 18)
-    pdf.set_text_color(255, 47, 146)
-    pdf.cell(0, 12, txt="SPECTRA HOLIPARTY 2026", ln=1, align='C')
-    pdf.set_font("Arial", '', 12)
-    pdf.set_text_color(0, 0, 0)
-    pdf.cell(0, 8, txt="Entry Ticket", ln=1, align='C')
-    pdf.ln(5)
+def ticket_cache_key(booking):
+    fields = {f: booking.get(f) for f in TICKET_FIELDS}
+    fields['amount'] = _ticket_amount(booking)
+    fields['venue'] = booking.get('venue', 'Kunjachaya, Bhadreswar')
+    fields['event_date'] = booking.get('event_date', 'March 3, 2026')
+    # The QR is signed with a key derived from SECRET_KEY: rotating it must re-render tickets
+    from utils.gate_utils import key_id
+    raw = json.dumps([TICKET_RENDER_VERSION, key_id().hex(), fields], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def generate_ticket_pdf(booking):
+    """Generate a PDF ticket for the booking (served from the ticket cache when unchanged). Returns BytesIO buffer."""
+    key = ticket_cache_key(booking)
+    data = ticket_cache.get(key)
+    if data is None:
+        data = _render_ticket_pdf(booking)
+        ticket_cache.put(key, data)
+    pdf_buf = io.BytesIO(data)
+    pdf_buf.seek(0)
+    return pdf_buf
+
+
+def draw_qr(pdf, matrix, x, y, size):
+    """
+    Draw a QR module matrix as filled rectangles (vector, no PNG/temp file).
+    Horizontal runs of dark modules are merged into one rectangle each.
+    """
+    modules = len(matrix) + 2 * QR_QUIET_ZONE
+    unit = float(size) / modules
+    origin_x = x + QR_QUIET_ZONE * unit
+    origin_y = y + QR_QUIET_ZONE * unit
+    pdf.set_fill_color(0, 0, 0)
+    for r, row in enumerate(matrix):
+        c = 0
+        n = len(row)
+        while c < n:
+            if not row[c]:
+                c += 1
+                continue
+            start = c
+            while c < n and row[c]:
+                c += 1
+            pdf.rect(origin_x + start * unit, origin_y + r * unit, (c - start) * unit, unit, 'F')
+
+
+class TicketSkeleton:
+    """
+    The parts of a ticket that are the same for every booking of an event: header, border line,
+    date/venue/complimentary lines and footer, drawn once on an FPDF page.
+    Bookings are rendered on a cheap clone of that page (see _draw_ticket_fields).
+    """
+
+    def __init__(self, venue, event_date):
+        self.venue = venue
+        self.event_date = event_date
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+
+        # Header - Spectra HoliParty
+        pdf.set_font("Arial", 'B', 18)
+        pdf.set_text_color(255, 47, 146)
+        pdf.cell(0, 12, txt="SPECTRA HOLIPARTY 2026", ln=1, align='C')
+        pdf.set_font("Arial", '', 12)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(0, 8, txt="Entry Ticket", ln=1, align='C')
+        pdf.ln(5)
+
+        # Ticket border effect (thick line)
+        pdf.set_draw_color(255, 47, 146)
+        pdf.set_line_width(1)
+        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+        pdf.ln(8)
+
+        # Name / Ticket ID / Amount / Passes rows are left blank for the overlay
+        self.fields_y = pdf.get_y()
+        pdf.set_y(self.fields_y + 8 + 8 + 10 + 6)
+
+        pdf.set_font("Arial", '', 11)
+        pdf.cell(0, 6, txt=f"Date: {event_date} | Time: 10:00 AM - 5:00 PM", ln=1)
+        pdf.cell(0, 6, txt=f"Venue: {venue}", ln=1)
+        pdf.cell(0, 6, txt="Complimentary: Abir & Special Lassi", ln=1)
+        pdf.ln(5)
+
+        # QR code slot
+        self.qr_y = pdf.get_y()
+        pdf.set_y(self.qr_y + 65)
+
+        pdf.set_font("Arial", 'I', 8)
+        pdf.set_text_color(128, 128, 128)
+        pdf.cell(0, 5, txt="Show this ticket at the gate. Organized by Spectra Group - 2nd Year of HoliParty!", ln=1, align='C')
+        self._pdf = pdf
+
+    def new_page(self):
+        """A copy of the skeleton document that can be drawn on and output independently."""
+        src = self._pdf
+        pdf = copy.copy(src)
+        # output() mutates these containers, so each ticket gets its own
+        pdf.pages = dict(src.pages)
+        pdf.offsets = dict(src.offsets)
+        pdf.fonts = {k: dict(v) for k, v in src.fonts.items()}
+        pdf.font_files = {k: dict(v) for k, v in src.font_files.items()}
+        pdf.diffs = dict(src.diffs)
+        pdf.images = {k: dict(v) for k, v in src.images.items()}
+        pdf.page_links = {k: list(v) for k, v in src.page_links.items()}
+        pdf.links = dict(src.links)
+        pdf.orientation_changes = dict(src.orientation_changes)
+        return pdf
+
+
+_skeletons = OrderedDict()
+_skeletons_lock = threading.Lock()
+MAX_SKELETONS = 8
 
-    # Ticket border effect (thick line)
-    pdf.set_draw_color(255, 47, 146)
-    pdf.set_line_width(1)
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-    pdf.ln(8)
+
+def get_ticket_skeleton(venue, event_date):
+    """Skeleton for this event content (built once, reused for every ticket with the same venue/date)."""
+    key = (TICKET_RENDER_VERSION, venue, event_date)
+    with _skeletons_lock:
+        skeleton = _skeletons.get(key)
+        if skeleton is None:
+            skeleton = TicketSkeleton(venue, event_date)
+            _skeletons[key] = skeleton
+            while len(_skeletons) > MAX_SKELETONS:
+                _skeletons.popitem(last=False)
+        else:
+            _skeletons.move_to_end(key)
+        return skeleton
+
+
+def _pass_label(booking):
+    pass_type_labels = {
+        'entry': 'Entry Only',
+        'entry_starter': 'Entry + Starter',
+        'entry_starter_lunch': 'Entry + Starter + Lunch'
+    }
+    pass_label = pass_type_labels.get(booking.get('pass_type', 'entry'), 'Entry Only')
+    if booking.get('is_couple_booking'):
+        pass_label += " (Couple Offer)"
+    elif booking.get('is_group_booking'):
+        if booking.get('passes', 1) >= 8:
+             pass_label += " (Group 15% Off)"
+        else:
+             pass_label += " (Group 10% Off)"
+    return pass_label
+
+
+def _draw_ticket_fields(pdf, skeleton, booking, matrix):
+    """Per-booking overlay: name, ticket ID, amount, passes and QR code."""
+    pdf.set_xy(pdf.l_margin, skeleton.fields_y)
+    pdf.set_text_color(0, 0, 0)
 
     # Name - prominent
     pdf.set_font("Arial", 'B', 14)
     pdf.cell(0, 8, txt=f"Name: {booking['name']}", ln=1)
-    pdf.set_font("Arial", '', 11)
 
     # Ticket ID - prominent
     pdf.set_font("Arial", 'B', 13)
     pdf.set_text_color(0, 100, 0)
     pdf.cell(0, 8, txt=f"Ticket ID: {booking['ticket_id']}", ln=1)
     pdf.set_text_color(0, 0, 0)
-    pdf.set_font("Arial", '', 11)
 
     # Amount - HIGHLIGHTED
     pdf.set_fill_color(255, 212, 0)  # Yellow highlight
     pdf.set_font("Arial", 'B', 14)
-    pdf.cell(0, 10, txt=f"Amount Paid: Rs. {amount}", ln=1, fill=True)
+    pdf.cell(0, 10, txt=f"Amount Paid: Rs. {_ticket_amount(booking)}", ln=1, fill=True)
     pdf.set_font("Arial", '', 11)
 
-    # Other details
-    pdf.cell(0, 6, txt=f"Passes: {booking['passes']} | Type: {pass_label}", ln=1)
-    event_date = booking.get('event_date', 'March 3, 2026')
-    pdf.cell(0, 6, txt=f"Date: {event_date} | Time: 10:00 AM - 5:00 PM", ln=1)
-    pdf.cell(0, 6, txt=f"Venue: {venue}", ln=1)
-    pdf.cell(0, 6, txt="Complimentary: Abir & Special Lassi", ln=1)
-    pdf.ln(5)
+    pdf.cell(0, 6, txt=f"Passes: {booking['passes']} | Type: {_pass_label(booking)}", ln=1)
 
     # QR Code
-    if qr_path:
-        try:
-            y_pos = pdf.get_y()
-            pdf.image(qr_path, x=75, y=y_pos, w=60)
-            pdf.set_y(y_pos + 65)
-        except Exception:
-            pass
-        finally:
-            if qr_path and os.path.exists(qr_path):
-                try:
-                    os.unlink(qr_path)
-                except Exception:
-                    pass
-
-    pdf.set_font("Arial", 'I', 8)
-    pdf.set_text_color(128, 128, 128)
-    pdf.cell(0, 5, txt="Show this ticket at the gate. Organized by Spectra Group - 2nd Year of HoliParty!", ln=1, align='C')
+    draw_qr(pdf, matrix, x=75, y=skeleton.qr_y, size=60)
+
+
+def _ticket_matrix(booking):
+    """
+    QR matrix of the booking's signed payload. Raises when it cannot be encoded: a ticket
+    without a scannable QR must not be rendered or emailed, so the job fails instead.
+    """
+    from qrcode.exceptions import DataOverflowError
+    from utils.gate_utils import sign_ticket
+    from utils.qr_utils import qr_matrix
+    try:
+        return qr_matrix(sign_ticket(booking))
+    except (DataOverflowError, ValueError) as e:
+        print(f"Ticket QR encode failed for {booking.get('ticket_id')}: {e}")
+        raise
+
+
+def _booking_skeleton(booking):
+    return get_ticket_skeleton(booking.get('venue', 'Kunjachaya, Bhadreswar'),
+                               booking.get('event_date', 'March 3, 2026'))
+
+
+def _render_ticket_pdf(booking, skeleton=None, matrix=None):
+    """Draw the booking's fields onto the event's ticket skeleton. Returns PDF bytes."""
+    if matrix is None:
+        matrix = _ticket_matrix(booking)
+    if skeleton is None:
+        skeleton = _booking_skeleton(booking)
+    pdf = skeleton.new_page()
+    _draw_ticket_fields(pdf, skeleton, booking, matrix)
 
     out = pdf.output(dest='S')
     if isinstance(out, str):
         out = out.encode('latin-1')
-    pdf_buf = io.BytesIO(out)
-    pdf_buf.seek(0)
-    return pdf_buf
+    return out
+
+
+# Batch print layouts: (columns, rows) of tickets per A4 sheet
+PRINT_LAYOUTS = {'page': (1, 1), 'grid': (2, 2)}
+
+
+class _PdfWriter:
+    """
+    Just enough of a PDF serializer to emit objects as they are produced.
+    Objects 1-3 (catalog, page tree, shared resources) are reserved and written last,
+    since only then are the page list and fonts known; the xref only needs their offsets.
+    """
+
+    def __init__(self):
+        self.offsets = {}
+        self.position = 0
+        self.last_id = 3
+        self._chunks = []
+
+    def new_id(self):
+        self.last_id += 1
+        return self.last_id
+
+    def write(self, data):
+        self._chunks.append(data)
+        self.position += len(data)
+
+    def obj(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.position
+        self.write(f"{obj_id} 0 obj\n".encode('ascii'))
+        if stream is None:
+            self.write(body.encode('latin-1') + b"\nendobj\n")
+        else:
+            self.write(body.encode('latin-1') + b"\nstream\n" + stream + b"\nendstream\nendobj\n")
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+    def finish(self):
+        size = self.last_id + 1
+        xref = self.position
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[n]:010d} 00000 n \n" for n in range(1, size)]
+        lines.append(f"trailer\n<</Size {size} /Root 1 0 R>>\nstartxref\n{xref}\n%%EOF\n")
+        self.write(''.join(lines).encode('ascii'))
+
+
+def _cut_guides(cols, rows, w, h):
+    """Dashed grey lines between grid cells."""
+    ops = ['q 0.75 G 0.5 w [4 4] 0 d']
+    ops += [f"{w * c / cols:.2f} 0 m {w * c / cols:.2f} {h:.2f} l S" for c in range(1, cols)]
+    ops += [f"0 {h * r / rows:.2f} m {w:.2f} {h * r / rows:.2f} l S" for r in range(1, rows)]
+    ops.append('Q')
+    return '\n'.join(ops) + '\n'
+
+
+def iter_ticket_batch_pdf(bookings, layout='page'):
+    """
+    Yield one multi-page PDF of `bookings` in chunks, for printing: layout 'page' puts one
+    ticket on each A4 page, 'grid' four (2x2 at half size). Every ticket is drawn on its event
+    skeleton exactly as a single ticket is, and that page's content is copied into the batch,
+    so fonts are declared once for the file and only one sheet is in memory at a time.
+    """
+    cols, rows = PRINT_LAYOUTS.get(layout, PRINT_LAYOUTS['page'])
+    scale = 1.0 / max(cols, rows)
+    out = _PdfWriter()
+    out.write(b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n")
+    fonts = {}  # resource index -> base font name
+    kids = []
+    size = None
+    cells = []
+
+    def put_sheet():
+        w, h = size
+        parts = []
+        if cols * rows > 1:
+            parts.append(_cut_guides(cols, rows, w, h))
+        for i, content in enumerate(cells):
+            col, row = i % cols, i // cols
+            tx, ty = w * col / cols, h - h * (row + 1) / rows
+            parts.append(f"q {scale:.4f} 0 0 {scale:.4f} {tx:.2f} {ty:.2f} cm\n{content}Q\n")
+        page_id, content_id = out.new_id(), out.new_id()
+        data = zlib.compress(''.join(parts).encode('latin-1', 'replace'))
+        out.obj(content_id, f"<</Filter /FlateDecode /Length {len(data)}>>", data)
+        out.obj(page_id, f"<</Type /Page /Parent 2 0 R /MediaBox [0 0 {w:.2f} {h:.2f}] "
+                         f"/Resources 3 0 R /Contents {content_id} 0 R>>")
+        kids.append(page_id)
+        cells.clear()
+
+    for booking in bookings:
+        skeleton = _booking_skeleton(booking)
+        pdf = skeleton.new_page()
+        _draw_ticket_fields(pdf, skeleton, booking, _ticket_matrix(booking))
+        for font in pdf.fonts.values():
+            fonts[font['i']] = font['name']
+        size = size or (pdf.w_pt, pdf.h_pt)
+        cells.append(pdf.pages[1])
+        if len(cells) == cols * rows:
+            put_sheet()
+            yield out.take()
+
+    if cells or not kids:
+        size = size or (595.28, 841.89)  # A4; an empty batch still gets one (blank) page
+        put_sheet()
+
+    font_refs = []
+    for i, name in sorted(fonts.items()):
+        font_id = out.new_id()
+        encoding = '' if name in ('Symbol', 'ZapfDingbats') else ' /Encoding /WinAnsiEncoding'
+        out.obj(font_id, f"<</Type /Font /BaseFont /{name} /Subtype /Type1{encoding}>>")
+        font_refs.append(f"/F{i} {font_id} 0 R")
+    out.obj(3, f"<</ProcSet [/PDF /Text] /Font <<{' '.join(font_refs)}>> >>")
+    out.obj(2, f"<</Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)}>>")
+    out.obj(1, "<</Type /Catalog /Pages 2 0 R>>")
+    out.finish()
+    yield out.take()
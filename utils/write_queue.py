@@ -0,0 +1,407 @@
+"""Write-behind queue: bookings are recorded locally at once and pushed to Sheet/Mongo in batches."""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows (dev only): the journal is then not locked across processes
+    fcntl = None
+
+from config import Config
+from utils.booking_index import normalize
+
+
+def _journal_path():
+    base = (getattr(Config, 'DATA_DIR', '') or '').strip()
+    return os.path.join(base, 'booking_queue.jsonl') if base else 'booking_queue.jsonl'
+
+
+def _apply_entry(pending, updates, entry):
+    """
+    Apply one journal entry. pending: {ticket: snapshot}; updates: {ticket: fields} for
+    tickets whose remote write is a field-level $set rather than the whole snapshot.
+    Returns the ticket key (or '').
+    """
+    key = normalize(entry.get('ticket_id'))
+    op = entry.get('op')
+    if not key:
+        return ''
+    fields = entry.get('fields') or {}
+    if op == 'put':
+        pending[key] = entry.get('booking') or {}
+        updates.pop(key, None)
+    elif op == 'update':
+        if key in pending and key not in updates:
+            # A new booking not written yet: the change just rides along with it
+            pending[key] = {**pending[key], **fields}
+        else:
+            pending[key] = {**(entry.get('booking') or {}), **fields}
+            updates[key] = {**updates.get(key, {}), **fields}
+    elif op == 'merge' and key in pending:
+        pending[key] = {**pending[key], **fields}
+        if key in updates:
+            updates[key] = {**updates[key], **fields}
+    elif op == 'discard':
+        pending.pop(key, None)
+        updates.pop(key, None)
+    return key
+
+
+def _as_journaled(booking):
+    # What a snapshot looks like after a round trip through the journal (datetimes become strings)
+    return json.loads(json.dumps(booking, default=str))
+
+
+class WriteBehindQueue:
+    """
+    Pending booking snapshots keyed by ticket ID (later writes to the same ticket coalesce).
+    - Every change is appended to a JSONL journal so pending writes survive a crash/restart.
+      The journal is shared by every process (a recycled worker's drain overlaps its
+      replacement's start), so appends and compaction hold an flock on a sidecar lock file.
+    - Each worker replays the journal when its flusher starts: the copy inherited from the
+      preloading master is only what was pending when the master imported this module.
+    - A per-process flusher thread hands everything pending to `flush_fn` every
+      `flush_interval` seconds; failures are retried with backoff.
+    - drain() flushes synchronously; it runs on gunicorn worker exit and at interpreter exit.
+    """
+
+    def __init__(self, journal_path, flush_interval=0.3, max_batch=500, max_attempts=10):
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._flush_fn = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}  # ticket -> booking snapshot
+        self._updates = {}  # ticket -> fields, when only those fields are written (see enqueue_update)
+        self._enqueued_at = {}  # ticket -> first enqueue time (for lag stats)
+        self._attempts = {}  # ticket -> failed flushes of its current snapshot
+        self._parked = set()  # tickets that hit max_attempts: not flushed until written again
+        self._flusher_pid = None
+        self._retry_at = 0
+        self._backoff = 0
+        self._stats = {
+            'flushed_total': 0,
+            'flush_count': 0,
+            'failed_flushes': 0,
+            'last_flush_at': None,
+            'last_flush_ms': None,
+            'avg_flush_ms': None,
+            'last_lag_ms': None,
+            'last_error': None,
+        }
+        self._replay_journal()
+
+    def set_flush_fn(self, flush_fn):
+        """
+        flush_fn(list[dict], {ticket: fields}) -> bool; True means the batch is durably written.
+        Tickets in the second argument changed only those fields (the snapshot may lack others).
+        """
+        self._flush_fn = flush_fn
+
+    # ---- journal -------------------------------------------------------------------------
+
+    @contextmanager
+    def _journal_lock(self):
+        if fcntl is None:
+            yield
+            return
+        d = os.path.dirname(self.journal_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(self.journal_path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_journal(self):
+        """The journal file replayed into (pending, updates) (call with the journal lock held)."""
+        pending, updates = {}, {}
+        if not os.path.exists(self.journal_path):
+            return pending, updates
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                _apply_entry(pending, updates, entry)
+        return pending, updates
+
+    def _replay_journal(self):
+        """Replace this process's pending writes with what the journal holds."""
+        try:
+            with self._journal_lock():
+                pending, updates = self._read_journal()
+        except Exception as e:
+            print(f"Write-behind journal replay failed: {e}")
+            return
+        with self._lock:
+            now = time.time()
+            self._pending = pending
+            self._updates = updates
+            self._enqueued_at = {key: now for key in pending}
+            self._attempts = {}
+            self._parked = set()
+            self._retry_at = 0
+            self._backoff = 0
+        if pending:
+            print(f"Write-behind queue: replayed {len(pending)} pending booking(s) from journal (pid {os.getpid()})")
+
+    def _apply(self, entry):
+        key = _apply_entry(self._pending, self._updates, entry)
+        # New data for a ticket gets a fresh set of attempts
+        self._attempts.pop(key, None)
+        self._parked.discard(key)
+        if key in self._pending:
+            self._enqueued_at.setdefault(key, time.time())
+        else:
+            self._enqueued_at.pop(key, None)
+
+    def _journal(self, entry):
+        try:
+            with self._journal_lock():
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, default=str) + '\n')
+        except Exception as e:
+            print(f"Write-behind journal append failed (non-fatal): {e}")
+
+    def _compact_journal(self, flushed, flushed_updates):
+        """
+        Drop the entries this process just persisted from the journal. The file is re-read
+        under the lock, not rewritten from this process's view: another worker may have
+        journaled writes this one never saw. An entry is only dropped while it is still the
+        snapshot that was flushed (a newer write to the same ticket stays).
+        """
+        try:
+            with self._journal_lock():
+                on_disk, disk_updates = self._read_journal()
+                for key, booking in flushed.items():
+                    if (key in on_disk and on_disk[key] == _as_journaled(booking)
+                            and disk_updates.get(key) == _as_journaled(flushed_updates.get(key))):
+                        del on_disk[key]
+                        disk_updates.pop(key, None)
+                d = os.path.dirname(self.journal_path) or '.'
+                fd, tmp_path = tempfile.mkstemp(prefix='tmp_', suffix='.jsonl', dir=d)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for key, booking in on_disk.items():
+                        if key in disk_updates:
+                            entry = {'op': 'update', 'ticket_id': key, 'booking': booking, 'fields': disk_updates[key]}
+                        else:
+                            entry = {'op': 'put', 'ticket_id': key, 'booking': booking}
+                        f.write(json.dumps(entry, default=str) + '\n')
+                os.replace(tmp_path, self.journal_path)
+        except Exception as e:
+            print(f"Write-behind journal compaction failed (non-fatal): {e}")
+
+    # ---- producer API ----------------------------------------------------------------------
+
+    def enqueue(self, booking):
+        """Queue a full booking snapshot for Sheet/Mongo persistence."""
+        key = normalize(booking.get('ticket_id'))
+        if not key:
+            return
+        snapshot = {k: v for k, v in booking.items() if k != '_id'}
+        entry = {'op': 'put', 'ticket_id': key, 'booking': snapshot}
+        self._ensure_flusher()
+        with self._lock:
+            self._journal(entry)
+            self._apply(entry)
+        self._wakeup.set()
+
+    def enqueue_update(self, booking, fields):
+        """
+        Queue a change to some fields of an existing booking. `booking` (the current row,
+        already including `fields`) is what the Sheet row is rewritten from; MongoDB only
+        gets `fields`, so document fields the snapshot lacks (address, pricing...) survive.
+        """
+        key = normalize(booking.get('ticket_id'))
+        if not key:
+            return
+        snapshot = {k: v for k, v in booking.items() if k != '_id'}
+        entry = {'op': 'update', 'ticket_id': key, 'booking': snapshot, 'fields': dict(fields)}
+        self._ensure_flusher()
+        with self._lock:
+            self._journal(entry)
+            self._apply(entry)
+        self._wakeup.set()
+
+    def merge_pending(self, ticket_id, fields):
+        """Fold an update into a not-yet-flushed snapshot. Returns True if the ticket was pending."""
+        key = normalize(ticket_id)
+        self._ensure_flusher()
+        with self._lock:
+            if key not in self._pending:
+                return False
+            entry = {'op': 'merge', 'ticket_id': key, 'fields': fields}
+            self._journal(entry)
+            self._apply(entry)
+            return True
+
+    def discard(self, ticket_id):
+        """Drop a pending write (booking deleted before it was flushed)."""
+        key = normalize(ticket_id)
+        self._ensure_flusher()
+        with self._lock:
+            if key not in self._pending:
+                return False
+            entry = {'op': 'discard', 'ticket_id': key}
+            self._journal(entry)
+            self._apply(entry)
+            return True
+
+    def pending(self):
+        with self._lock:
+            return [dict(b) for b in self._pending.values()]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _flushable(self):
+        return len(self._pending) > len(self._parked)
+
+    # ---- flushing ------------------------------------------------------------------------
+
+    def flush(self):
+        """Flush one batch. Returns True when nothing is left pending from that batch."""
+        if self._flush_fn is None:
+            return False
+        with self._flush_lock:
+            with self._lock:
+                if not self._flushable():
+                    return True
+                batch = dict([(k, b) for k, b in self._pending.items() if k not in self._parked][:self.max_batch])
+                batch_updates = {k: dict(self._updates[k]) for k in batch if k in self._updates}
+                oldest = min(self._enqueued_at.get(k, time.time()) for k in batch)
+            started = time.time()
+            try:
+                ok = bool(self._flush_fn(list(batch.values()), batch_updates))
+                error = None if ok else 'flush returned False'
+            except Exception as e:
+                ok, error = False, str(e)
+            elapsed_ms = round((time.time() - started) * 1000, 1)
+
+            with self._lock:
+                if ok:
+                    for key, booking in batch.items():
+                        # Only clear entries that weren't re-queued/merged while we were flushing
+                        if self._pending.get(key) is booking:
+                            self._pending.pop(key, None)
+                            self._updates.pop(key, None)
+                            self._enqueued_at.pop(key, None)
+                            self._attempts.pop(key, None)
+                    self._compact_journal(batch, batch_updates)
+                    self._stats['flushed_total'] += len(batch)
+                    self._stats['flush_count'] += 1
+                    self._stats['last_flush_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+                    self._stats['last_lag_ms'] = round((time.time() - oldest) * 1000, 1)
+                    avg = self._stats['avg_flush_ms']
+                    self._stats['avg_flush_ms'] = elapsed_ms if avg is None else round(avg * 0.8 + elapsed_ms * 0.2, 1)
+                    self._backoff = 0
+                    self._retry_at = 0
+                else:
+                    self._stats['failed_flushes'] += 1
+                    self._stats['last_error'] = error
+                    self._backoff = min(60, (self._backoff * 2) or 1)
+                    self._retry_at = time.time() + self._backoff
+                    print(f"Write-behind flush of {len(batch)} booking(s) failed ({error}); retrying in {self._backoff}s")
+                    parked = []
+                    for key, booking in batch.items():
+                        if self._pending.get(key) is not booking:
+                            continue  # rewritten meanwhile: already has fresh attempts
+                        self._attempts[key] = self._attempts.get(key, 0) + 1
+                        if self.max_attempts and self._attempts[key] >= self.max_attempts:
+                            self._parked.add(key)
+                            parked.append(key)
+                    if parked:
+                        print(f"Write-behind: parked {len(parked)} booking(s) after {self.max_attempts} failed "
+                              f"flushes; kept in the journal until they change or the worker restarts")
+                self._stats['last_flush_ms'] = elapsed_ms
+            return ok
+
+    def drain(self, timeout=20):
+        """Flush everything pending (ignores retry backoff). Returns True if only parked rows are left."""
+        deadline = time.time() + timeout
+        failures = 0
+        while self._flushable() and time.time() < deadline:
+            if self.flush():
+                failures = 0
+                continue
+            failures += 1
+            if failures >= 3:
+                break  # store is down; the journal keeps the rows for the next process
+            time.sleep(1)
+        if self._pending:
+            print(f"Write-behind drain left {len(self._pending)} booking(s) in the journal")
+        return not self._flushable()
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            oldest = min(self._enqueued_at.values()) if self._enqueued_at else None
+            return {
+                'depth': len(self._pending),
+                'parked': len(self._parked),
+                'max_attempts': self.max_attempts,
+                'oldest_pending_age_s': round(now - oldest, 1) if oldest else 0,
+                'retry_in_s': round(max(0, self._retry_at - now), 1),
+                **self._stats,
+            }
+
+    def start(self):
+        """
+        Adopt the journal and start this process's flusher (gunicorn's post_fork hook;
+        producers call it too, for servers without the hook).
+        """
+        self._ensure_flusher()
+        if self._pending:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        # Threads don't survive gunicorn's fork (preload=True), so start one per process
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            # Pending writes inherited over fork are a stale copy: the journal has the current set
+            self._replay_journal()
+            self._flusher_pid = pid
+            t = threading.Thread(target=self._flush_loop, name='booking-write-behind', daemon=True)
+            t.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(timeout=max(self.flush_interval, 1))
+            # Give concurrent requests a moment to land in the same batch
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            if self._flushable() and time.time() >= self._retry_at:
+                self.flush()
+
+
+write_queue = WriteBehindQueue(
+    _journal_path(),
+    flush_interval=float(getattr(Config, 'WRITE_BEHIND_FLUSH_SECONDS', 0.3) or 0.3),
+    max_attempts=int(getattr(Config, 'WRITE_BEHIND_MAX_ATTEMPTS', 10) or 0),
+)
+
+
+@atexit.register
+def _drain_at_exit():
+    # Only the process that owns a flusher drains; a preloading master holds a stale copy
+    if write_queue._flusher_pid == os.getpid() and write_queue._pending and write_queue._flush_fn is not None:
+        write_queue.drain(timeout=10)